@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
 from django.contrib.auth.validators import UnicodeUsernameValidator
@@ -6,7 +8,7 @@ from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django_rest_passwordreset.tokens import get_token_generator
 
-from backend.models import Product
+from backend.models import Product, ProductRating
 from .managers import UserManager
 
 USER_TYPE_CHOICES = (
@@ -137,10 +139,49 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Список комментариев'
         ordering = ['posted']
+        indexes = [
+            models.Index(fields=['product', 'posted', 'id'],
+                         name='comment_product_posted_idx'),
+            models.Index(fields=['user', 'posted', 'id'],
+                         name='comment_user_posted_idx'),
+        ]
 
     def __str__(self):
         return '{} by {}. {}'.format(self.text, self.user, self.posted)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._rating_state = (instance.__dict__.get('product_id'),
+                                  instance.__dict__.get('rating'))
+        return instance
+
+
+@receiver(post_save, sender=Comment)
+def comment_post_save(sender, instance, created, **kwargs):
+    new_state = (instance.product_id, instance.rating)
+    old_state = getattr(instance, '_rating_state', None)
+    if created:
+        if instance.product_id is not None:
+            ProductRating.apply(*new_state, delta=1)
+    elif old_state is None:
+        if instance.product_id is not None:
+            ProductRating.rebuild(product_ids=[instance.product_id])
+    elif old_state != new_state:
+        if old_state[0] is not None:
+            ProductRating.apply(*old_state, delta=-1)
+        if instance.product_id is not None:
+            ProductRating.apply(*new_state, delta=1)
+    instance._rating_state = new_state
+
+
+@receiver(post_delete, sender=Comment)
+def comment_post_delete(sender, instance, **kwargs):
+    product_id, rating = getattr(instance, '_rating_state',
+                                 (instance.product_id, instance.rating))
+    if product_id is not None:
+        ProductRating.apply(product_id, rating, delta=-1)
+
 
 class ConfirmEmailToken(models.Model):
     class Meta:
@@ -1,9 +1,14 @@
+from functools import lru_cache
+
 from django import template
+from django.utils.html import escape
 from django.utils.safestring import mark_safe
 import re
 
 register = template.Library()
 
+SNIPPET_LENGTH = 160
+
 
 @register.filter(name='get_range')
 def get_range(number):
@@ -37,12 +42,60 @@ def to_str(value):
     return str(value)
 
 
+@lru_cache(maxsize=256)
+def search_pattern(query):
+    # One alternation per query, longest terms first so that "phone" wins
+    # over "pho"; the terms are matched literally.
+    terms = sorted(set(str(query).lower().split()), key=len, reverse=True)
+    if not terms:
+        return None
+    return re.compile('|'.join(map(re.escape, terms)), re.IGNORECASE)
+
+
+def _highlight(text, pattern):
+    parts = []
+    position = 0
+    for match in pattern.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        parts.append(f'<span class="highlight">{escape(match.group())}</span>')
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return mark_safe(''.join(parts))
+
+
 @register.filter()
 def highlight_search(text, value):
-    if text is not None:
-        text = str(text)
-        src_str = re.compile(value, re.IGNORECASE)
-        str_replaced = src_str.sub(f"<span class=\"highlight\">{value}</span>", text)
+    if text is None:
+        return ''
+    pattern = search_pattern(value or '')
+    if pattern is None:
+        return escape(text)
+    return _highlight(str(text), pattern)
+
+
+@register.filter()
+def search_snippet(text, value):
+    # A window of SNIPPET_LENGTH characters around the first match instead
+    # of the whole text, highlighted the same way.
+    if text is None:
+        return ''
+    text = str(text)
+    pattern = search_pattern(value or '')
+    match = pattern.search(text) if pattern is not None else None
+    start = 0
+    if match is not None:
+        start = max(0, match.start() - SNIPPET_LENGTH // 4)
+        if start:
+            space = text.find(' ', start, match.start())
+            start = space + 1 if space != -1 else start
+    end = start + SNIPPET_LENGTH
+    if end < len(text):
+        space = text.rfind(' ', start, end)
+        end = space if space > start else end
+    snippet = text[start:end]
+    if pattern is not None:
+        snippet = _highlight(snippet, pattern)
     else:
-        str_replaced = ''
-    return mark_safe(str_replaced)
+        snippet = escape(snippet)
+    return mark_safe(('…' if start else '') + snippet +
+                     ('…' if end < len(text) else ''))
@@ -3,9 +3,10 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Sum, Q
+from django.db.models import Q
 from django.db.utils import IntegrityError
-from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404
+from django.shortcuts import render, redirect
 from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
 
@@ -13,10 +14,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from .forms import RegisterForm, SetPasswordForm, ResetPasswordForm
-from .models import ConfirmEmailToken, Comment, Contact, User
+from .models import ConfirmEmailToken, Contact, User
 from .tokens import account_activation_token
 
-from backend.models import Order, OrderItem, Product, ProductInfo, Shop
+from backend.models import Product, ProductInfo, Shop
+from backend.orders import load_order_detail, order_history_page, \
+    user_review_page
 from shop.task import send_email_to_confirm_user_email, \
     send_email_to_reset_password
 
@@ -95,20 +98,13 @@ class ProfileView(LoginRequiredMixin, APIView):
     template_name = 'profile.html'
 
     def get(self, request, *args, **kwargs):
-        try:
-            cart_count = Order.objects.filter(status='new').values_list(
-                'total_items_count', flat=True).get(user=self.request.user)
-        except (Order.DoesNotExist, TypeError):
-            cart_count = None
-
-        user = User.objects.get(id=self.request.user.id)
-        contact = Contact.objects.get(user=self.request.user)
-        orders = Order.objects.filter(user=self.request.user)
-        reviews = Comment.objects.filter(user=self.request.user).order_by(
-            '-posted')
+        user = self.request.user
+        contact = Contact.objects.get(user=user)
+        orders = order_history_page(user.id,
+                                    request.GET.get('orders_cursor'))
+        reviews = user_review_page(user.id, request.GET.get('reviews_cursor'))
 
         data = {
-            'cart_count': cart_count,
             'user': user,
             'contact': contact,
             'orders': orders,
@@ -251,24 +247,9 @@ class OrderView(LoginRequiredMixin, APIView):
     template_name = 'order.html'
 
     def get(self, request, order_id, *args, **kwargs):
-        order = get_object_or_404(Order,
-                                  id=order_id,
-                                  user=self.request.user)
-        products = OrderItem.objects.filter(order=order)
-        total_price = OrderItem.objects.filter(order=order).aggregate(
-            Sum('total_price'))
-        try:
-            cart_count = Order.objects.filter(status='new').values_list(
-                'total_items_count', flat=True).get(user=self.request.user)
-        except (Order.DoesNotExist, TypeError):
-            cart_count = None
-
-        data = {
-            'order': order,
-            'products': products,
-            'total_price': total_price,
-            'cart_count': cart_count
-        }
+        data = load_order_detail(order_id, self.request.user.id)
+        if data is None:
+            raise Http404
         return Response(data)
 
 @login_required
@@ -1,7 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
+from .fulfilment import SHOP_STATUSES, transition_orders
 from .models import Shop, Category, Product, ProductInfo, Parameter, Order, \
-    OrderItem, Brand
+    OrderItem, Brand, ProductRating, CatalogEntry, StockHold, STATUS_CHOICES
+from shop.task import send_email_order_status
 
 
 @admin.register(Shop)
@@ -23,7 +25,7 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(ProductInfo)
 class ShopAdmin(admin.ModelAdmin):
     list_display = ['id', 'brand', 'category', 'product', 'model', 'shop',
-                    'quantity', 'price', 'price_rrc']
+                    'quantity', 'reserved', 'price', 'price_rrc']
     list_filter = ['brand', 'category', 'shop']
 
 
@@ -32,12 +34,36 @@ class ShopAdmin(admin.ModelAdmin):
     list_display = ['id', 'name']
 
 
+def order_status_action(status):
+    # Orders with lines of several shops can not be moved by any one shop;
+    # these actions move them along the same transitions, with the emails.
+    def action(modeladmin, request, queryset):
+        changed = transition_orders(
+            None, list(queryset.values_list('pk', flat=True)), status)
+        if changed:
+            send_email_order_status.delay(changed)
+            modeladmin.message_user(
+                request, f'Статус "{status}" установлен для '
+                         f'{len(changed)} заказа(ов).')
+        skipped = queryset.count() - len(changed)
+        if skipped:
+            modeladmin.message_user(
+                request, f'{skipped} заказ(ов) нельзя перевести в статус '
+                         f'"{status}".', messages.ERROR)
+
+    action.__name__ = f'set_status_{status}'
+    action.short_description = \
+        f'Перевести в статус "{dict(STATUS_CHOICES)[status]}"'
+    return action
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'status', 'created', 'updated',
-                    'total_items_count']
+                    'total_items_count', 'total_price']
     list_display_links = ['user']
     list_filter = ['user', 'status', 'created', 'updated']
+    actions = [order_status_action(status) for status in SHOP_STATUSES]
 
 
 @admin.register(OrderItem)
@@ -49,3 +75,23 @@ class OrderItemAdmin(admin.ModelAdmin):
 @admin.register(Brand)
 class BrandAdmin(admin.ModelAdmin):
     list_display = ['id', 'name']
+
+
+@admin.register(ProductRating)
+class ProductRatingAdmin(admin.ModelAdmin):
+    list_display = ['product', 'average', 'rating_count', 'count_five',
+                    'count_four', 'count_three', 'count_two', 'count_one']
+
+
+@admin.register(CatalogEntry)
+class CatalogEntryAdmin(admin.ModelAdmin):
+    list_display = ['offer', 'product_name', 'brand_name', 'category_name',
+                    'shop_name', 'price', 'quantity', 'average_rating',
+                    'refreshed']
+    list_filter = ['category', 'brand', 'shop']
+
+
+@admin.register(StockHold)
+class StockHoldAdmin(admin.ModelAdmin):
+    list_display = ['item', 'offer', 'quantity', 'expires']
+    list_filter = ['expires']
@@ -0,0 +1,76 @@
+from array import array
+from collections import defaultdict
+
+from .cache import ATTRIBUTE_VERSION, VersionedIndex
+from .models import Parameter, ProductsParameters
+
+
+def _value_order(value):
+    return (0, int(value), '') if value.isdigit() else (1, 0, value.lower())
+
+
+def parse_attribute_filters(values):
+    # "<parameter id>:<value>" pairs from the query string, grouped by
+    # parameter: values of one parameter are alternatives, parameters are
+    # combined.
+    filters = defaultdict(set)
+    for item in values:
+        parameter_id, _, value = str(item).partition(':')
+        if parameter_id.isdigit() and value:
+            filters[int(parameter_id)].add(value)
+    return tuple((parameter_id, tuple(sorted(filters[parameter_id])))
+                 for parameter_id in sorted(filters))
+
+
+class AttributeIndex:
+    # Sorted product id arrays per (parameter, value), so a multi-parameter
+    # filter is a few set intersections in memory instead of one EAV join
+    # per parameter.
+    def __init__(self, postings, parameters, version=None):
+        self.version = version
+        self.postings = postings
+        self.parameters = parameters
+        self._values = defaultdict(list)
+        for parameter_id, value in sorted(
+                postings, key=lambda key: (key[0], _value_order(key[1]))):
+            self._values[parameter_id].append(value)
+
+    def values(self, parameter_id):
+        return self._values.get(parameter_id, [])
+
+    def product_ids(self, filters, exclude=None):
+        groups = []
+        for parameter_id, values in filters:
+            if parameter_id == exclude:
+                continue
+            ids = set()
+            for value in values:
+                ids.update(self.postings.get((parameter_id, value), ()))
+            groups.append(ids)
+        if not groups:
+            return None
+        groups.sort(key=len)
+        result = groups[0]
+        for ids in groups[1:]:
+            result = result.intersection(ids)
+        return result
+
+    @classmethod
+    def from_database(cls):
+        postings = defaultdict(set)
+        rows = ProductsParameters.objects.values_list(
+            'product_id', 'parameter_id', 'value').order_by()
+        for product_id, parameter_id, value in rows.iterator():
+            postings[(parameter_id, value)].add(product_id)
+        parameters = list(Parameter.objects.filter(
+            id__in={parameter_id for parameter_id, _ in postings}).values_list(
+            'id', 'name'))
+        return cls({key: array('l', sorted(ids))
+                    for key, ids in postings.items()}, parameters)
+
+
+_index = VersionedIndex(ATTRIBUTE_VERSION, AttributeIndex.from_database)
+
+
+def get_attribute_index():
+    return _index.get()
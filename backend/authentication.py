@@ -0,0 +1,12 @@
+from rest_framework.authentication import BaseAuthentication, \
+    SessionAuthentication
+
+
+class AnonymousCsrfAuthentication(BaseAuthentication):
+    # Put last in authentication_classes, so it only runs when no other
+    # class has authenticated the request. DRF views are csrf_exempt and
+    # SessionAuthentication checks CSRF for logged-in users only, while a
+    # visitor's cache cart is tied to the session cookie just the same.
+    def authenticate(self, request):
+        SessionAuthentication().enforce_csrf(request)
+        return None
@@ -0,0 +1,121 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION = 'catalog'
+LISTING_VERSION = 'listing'
+TAXONOMY_VERSION = 'taxonomy'
+ATTRIBUTE_VERSION = 'attributes'
+
+PAGE_CACHE_TIMEOUT = 60 * 5
+CART_COUNT_TIMEOUT = 60 * 60
+FRAGMENT_CACHE_TIMEOUT = 60 * 15
+
+
+def product_version_name(product_id):
+    return f'product:{product_id}'
+
+
+def cart_version_name(user_id):
+    return f'cart:{user_id}'
+
+
+def cart_count_key(user_id):
+    return f'cart_count:{user_id}'
+
+
+def _initial_version():
+    # Seeded from the clock so that a version key evicted from the cache
+    # never comes back with a value some stale entry was stored under.
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    return get_versions([name])[name]
+
+
+def get_versions(names):
+    keys = {f'version:{name}': name for name in names}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, _initial_version(), None)
+        found[key] = cache.get(key)
+    return {name: found[key] for key, name in keys.items()}
+
+
+def bump_version(*names):
+    versions = {}
+    for name in names:
+        key = f'version:{name}'
+        cache.add(key, _initial_version(), None)
+        try:
+            versions[name] = cache.incr(key)
+        except ValueError:
+            versions[name] = _initial_version()
+            cache.set(key, versions[name], None)
+    now = time.time()
+    cache.set_many({f'modified:{name}': now for name in names}, None)
+    return versions
+
+
+def get_stamps(names):
+    # Versions plus the time of the most recent bump among them. A missing
+    # timestamp counts as "just now", which only costs a full response.
+    versions = get_versions(names)
+    keys = [f'modified:{name}' for name in names]
+    modified = cache.get_many(keys)
+    now = time.time()
+    for key in set(keys) - modified.keys():
+        cache.add(key, now, None)
+        modified[key] = now
+    return versions, max(modified.values(), default=now)
+
+
+def page_cache_key(prefix, params, version):
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    return f'page:{prefix}:{version}:{digest}'
+
+
+class VersionedIndex:
+    # An in-memory index of one process kept in step with a shared version:
+    # built on first use (by load, when given, then by build), rebuilt when
+    # another process has bumped the version, and patched in place after
+    # this process's own changes commit. Indexes carry version and _lock.
+    def __init__(self, version_name, build, load=None):
+        self.version_name = version_name
+        self.build = build
+        self.load = load
+        self.index = None
+        self._build_lock = threading.Lock()
+
+    def get(self):
+        version = get_version(self.version_name)
+        with self._build_lock:
+            if self.index is None or self.index.version != version:
+                index = None
+                if self.index is None and self.load is not None:
+                    index = self.load(version)
+                if index is None:
+                    index = self.build()
+                index.version = version
+                self.index = index
+        return self.index
+
+    def patch_on_commit(self, change):
+        def apply():
+            version = bump_version(self.version_name)[self.version_name]
+            index = self.index
+            if index is None:
+                return
+            with index._lock:
+                # Only patch in place if no other process moved the version
+                # in between; otherwise the next use rebuilds from the table.
+                if index.version != version - 1:
+                    return
+                change(index)
+                index.version = version
+
+        transaction.on_commit(apply)
@@ -0,0 +1,316 @@
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .cache import CART_COUNT_TIMEOUT, LISTING_VERSION, bump_version, \
+    cart_count_key, cart_version_name, product_version_name
+from .catalog import schedule_catalog_refresh
+from .models import Order, OrderItem, ProductInfo, StockHold
+from .reservations import hold_stock
+
+
+CART_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def is_cache_cart():
+    return settings.CART_BACKEND == 'cache'
+
+
+def cart_offers(product_ids):
+    offers = {}
+    for offer in ProductInfo.objects.filter(
+            product_id__in=product_ids).select_related('product').order_by(
+            '-pk'):
+        offers[offer.product_id] = offer
+    return offers
+
+
+def _store_cart_count(user_id):
+    count = Order.objects.filter(
+        status='new', user_id=user_id).values_list(
+        'total_items_count', flat=True).first() or 0
+    cache.set(cart_count_key(user_id), count, CART_COUNT_TIMEOUT)
+    return count
+
+
+def cart_changed(user_id):
+    bump_version(cart_version_name(user_id))
+    # Rewritten only after commit, so that the entry holds the committed
+    # count and pages never go to the database for it.
+    transaction.on_commit(lambda: _store_cart_count(user_id))
+
+
+def cart_count(request):
+    # Number of items for the header badge, read from the cache: the cart
+    # itself for cache carts, otherwise a per-user entry that is rewritten
+    # on every cart change (cart_changed).
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_cart_count'):
+        user = request.user
+        if is_cache_cart():
+            count = CacheCart(request).count()
+        elif not user.is_authenticated:
+            count = 0
+        else:
+            count = cache.get(cart_count_key(user.pk))
+            if count is None:
+                count = _store_cart_count(user.pk)
+        request._cart_count = count
+    return request._cart_count
+
+
+def get_or_create_cart(user):
+    order, _ = Order.objects.get_or_create(status='new',
+                                           is_active=True,
+                                           user=user,
+                                           contact=user.contacts.first())
+    return order
+
+
+def add_items_to_cart(user, items):
+    # items: (product id, quantity) pairs. Prices come from one ProductInfo
+    # query and the order items are written with one bulk insert and one
+    # bulk update; the order totals are then recomputed once. The lines hold
+    # their stock for CART_HOLD_TTL seconds (see backend.reservations).
+    quantities = Counter()
+    for product_id, quantity in items:
+        quantities[product_id] += quantity
+    offers = cart_offers(quantities)
+
+    errors = [f'Product {product_id} does not found!'
+              for product_id in quantities if product_id not in offers]
+    if errors:
+        return None, errors
+
+    with transaction.atomic():
+        order = get_or_create_cart(user)
+        existing = {item.product_id: item for item in
+                    OrderItem.objects.select_for_update().filter(
+                        order=order, product_id__in=quantities)}
+        new_items = []
+        lines = []
+        for product_id, quantity in quantities.items():
+            offer = offers[product_id]
+            item = existing.get(product_id)
+            if item is None:
+                item = OrderItem(order=order,
+                                 product_id=product_id,
+                                 brand_id=offer.brand_id,
+                                 category_id=offer.category_id,
+                                 shop_id=offer.shop_id)
+                new_items.append(item)
+            item.quantity += quantity
+            item.price_per_item = offer.price
+            item.total_price = offer.price * item.quantity
+            lines.append((item, offer))
+
+        OrderItem.objects.bulk_create(new_items)
+        OrderItem.objects.bulk_update(
+            existing.values(), ['quantity', 'price_per_item', 'total_price'])
+        shortages = hold_stock(order, lines)
+        if shortages:
+            transaction.set_rollback(True)
+            return None, [f'SORRY, product {item.product_id} OUT OF STOCK '
+                          f'OR TO MANY!' for item in shortages]
+        Order.recompute_totals([order.pk])
+    # Bulk writes send no signals.
+    cart_changed(user.pk)
+    order.refresh_from_db(fields=['total_items_count', 'total_price'])
+    return order, []
+
+
+def place_order(order_id):
+    # Takes the stock of every line with a conditional UPDATE ... WHERE
+    # quantity - reserved >= n, in product order so that concurrent
+    # checkouts lock rows in the same sequence. A single short line rolls
+    # the whole order back. Returns the names of the products that were
+    # short.
+    with transaction.atomic():
+        try:
+            order = Order.objects.select_for_update().get(pk=order_id,
+                                                          status='new')
+        except Order.DoesNotExist:
+            return None, []
+        items = list(OrderItem.objects.filter(order=order).select_related(
+            'product').order_by('product_id', 'shop_id'))
+        holds = StockHold.objects.filter(item__order=order)
+        held = dict(holds.select_for_update().values_list('item_id',
+                                                          'quantity'))
+        shortages = []
+        for item in items:
+            # The line's own hold is consumed together with the stock; holds
+            # of other carts still count against it.
+            hold = held.get(item.pk, 0)
+            offers = ProductInfo.objects.filter(
+                product_id=item.product_id,
+                quantity__gte=F('reserved') - hold + item.quantity)
+            if item.shop_id is not None:
+                offers = offers.filter(shop_id=item.shop_id)
+            if not offers.update(quantity=F('quantity') - item.quantity,
+                                 reserved=F('reserved') - hold):
+                shortages.append(item.product.name if item.product
+                                 else str(item))
+        if shortages:
+            transaction.set_rollback(True)
+            return order, shortages
+        holds.delete()
+
+        order.status = 'ordered'
+        order.save(update_fields=['status', 'updated'])
+        # The stock UPDATEs bypass the ProductInfo signals. Bumped after
+        # commit, so that no page caches the old stock under the new version.
+        product_ids = [item.product_id for item in items]
+        transaction.on_commit(lambda: bump_version(
+            LISTING_VERSION, *map(product_version_name, product_ids)))
+        schedule_catalog_refresh(product_ids=product_ids)
+    return order, []
+
+
+class CacheCart:
+    # Working cart kept in the cache as {product id: quantity}, keyed by
+    # user or, for anonymous visitors, by an id stored in the session.
+    # Nothing is written to the database until checkout; stock is checked
+    # against the offers' available quantity but not held.
+    def __init__(self, request):
+        self.request = request
+        user = getattr(request, 'user', None)
+        self.user = user if user and user.is_authenticated else None
+
+    def _key(self, create=False):
+        if self.user is not None:
+            return f'cart:user:{self.user.pk}'
+        cart_id = self.request.session.get('cart_id')
+        if cart_id is None and create:
+            cart_id = self.request.session['cart_id'] = uuid.uuid4().hex
+        return cart_id and f'cart:session:{cart_id}'
+
+    def items(self):
+        key = self._key()
+        return dict(cache.get(key) or {}) if key else {}
+
+    def _save(self, items):
+        key = self._key(create=True)
+        if items:
+            cache.set(key, items, CART_CACHE_TIMEOUT)
+        else:
+            cache.delete(key)
+        if self.user is not None:
+            cart_changed(self.user.pk)
+
+    def count(self):
+        return sum(self.items().values())
+
+    def add_items(self, items):
+        cart = self.items()
+        quantities = Counter(cart)
+        for product_id, quantity in items:
+            quantities[product_id] += quantity
+        offers = cart_offers(quantities)
+        errors = []
+        for product_id, quantity in quantities.items():
+            offer = offers.get(product_id)
+            if offer is None:
+                errors.append(f'Product {product_id} does not found!')
+            elif quantity > offer.available:
+                errors.append(f'SORRY, product {product_id} OUT OF STOCK '
+                              f'OR TO MANY!')
+        if not errors:
+            self._save(dict(quantities))
+        return errors
+
+    def set_quantity(self, product_id, quantity):
+        cart = self.items()
+        if product_id not in cart:
+            return 'Product does not found in your cart! Please try again!'
+        offer = cart_offers([product_id]).get(product_id)
+        if offer is None or quantity > offer.available:
+            return 'SORRY, OUT OF STOCK OR TO MANY!'
+        if quantity > 0:
+            cart[product_id] = quantity
+        else:
+            del cart[product_id]
+        self._save(cart)
+        return None
+
+    def remove(self, product_id):
+        cart = self.items()
+        if cart.pop(product_id, None) is None:
+            return False
+        self._save(cart)
+        return True
+
+    def clear(self):
+        self._save({})
+
+    def merge_into(self, user):
+        # Moves the anonymous cart of the session into the user's cart after
+        # login (request.user is already the user by then).
+        self.user = None
+        cart = self.items()
+        if cart:
+            self.clear()
+        self.user = user
+        if not cart:
+            return
+        user_cart = self.items()
+        for product_id, quantity in cart.items():
+            user_cart[product_id] = user_cart.get(product_id, 0) + quantity
+        self._save(user_cart)
+
+    def order(self):
+        # Unsaved Order and OrderItem objects for the cart page.
+        cart = self.items()
+        offers = cart_offers(cart)
+        order = Order(user=self.user, status='new',
+                      contact=self.user.contacts.first() if self.user
+                      else None)
+        items = []
+        for product_id, quantity in cart.items():
+            offer = offers.get(product_id)
+            if offer is None:
+                continue
+            item = OrderItem(order=order, product=offer.product,
+                             brand_id=offer.brand_id,
+                             category_id=offer.category_id,
+                             shop_id=offer.shop_id, quantity=quantity,
+                             price_per_item=offer.price,
+                             total_price=offer.price * quantity)
+            # Removal links of cache carts address the product.
+            item.id = product_id
+            items.append(item)
+            order.total_items_count += quantity
+            order.total_price += item.total_price
+        return order, items
+
+    def checkout(self):
+        # Flushes the cart into Order/OrderItem rows and places the order
+        # in one transaction.
+        cart = self.items()
+        if not cart:
+            return None, []
+        offers = cart_offers(cart)
+        with transaction.atomic():
+            order = Order.objects.create(user=self.user, status='new',
+                                         is_active=True,
+                                         contact=self.user.contacts.first())
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_id,
+                          brand_id=offers[product_id].brand_id,
+                          category_id=offers[product_id].category_id,
+                          shop_id=offers[product_id].shop_id,
+                          quantity=quantity,
+                          price_per_item=offers[product_id].price,
+                          total_price=offers[product_id].price * quantity)
+                for product_id, quantity in cart.items()
+                if product_id in offers])
+            Order.recompute_totals([order.pk])
+            order, shortages = place_order(order.pk)
+            if shortages:
+                transaction.set_rollback(True)
+                return order, shortages
+        self.clear()
+        return order, []
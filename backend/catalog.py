@@ -0,0 +1,112 @@
+import threading
+
+from django.db import transaction
+from django.db.models import Q
+from kombu.exceptions import OperationalError
+
+from .cache import LISTING_VERSION, TAXONOMY_VERSION, bump_version, \
+    product_version_name
+from .models import CatalogEntry, ProductInfo, ProductRating
+
+UPDATE_FIELDS = ('product', 'brand', 'category', 'shop', 'product_name',
+                 'description', 'image', 'brand_name', 'category_name',
+                 'shop_name', 'model', 'quantity', 'price', 'price_rrc',
+                 'average_rating', 'rating_count')
+SCOPES = ('product_ids', 'brand_ids', 'category_ids', 'shop_ids')
+
+_pending = threading.local()
+
+
+def _offers():
+    return ProductInfo.objects.select_related(
+        'product__rating', 'brand', 'category', 'shop')
+
+
+def catalog_entry(offer):
+    try:
+        rating = offer.product.rating
+    except ProductRating.DoesNotExist:
+        rating = ProductRating()
+    return CatalogEntry(offer=offer,
+                        product_id=offer.product_id,
+                        brand_id=offer.brand_id,
+                        category_id=offer.category_id,
+                        shop_id=offer.shop_id,
+                        product_name=offer.product.name,
+                        description=offer.product.description,
+                        image=offer.product.image.name or '',
+                        brand_name=offer.brand.name,
+                        category_name=offer.category.name,
+                        shop_name=offer.shop.name,
+                        model=offer.model,
+                        quantity=max(offer.available, 0),
+                        price=offer.price,
+                        price_rrc=offer.price_rrc,
+                        average_rating=rating.average,
+                        rating_count=rating.rating_count)
+
+
+def refresh_catalog_entries(product_ids=(), brand_ids=(), category_ids=(),
+                            shop_ids=()):
+    scope = Q(product_id__in=product_ids) | Q(brand_id__in=brand_ids) | \
+        Q(category_id__in=category_ids) | Q(shop_id__in=shop_ids)
+    entries = [catalog_entry(offer) for offer in _offers().filter(scope)]
+    CatalogEntry.objects.bulk_create(entries,
+                                     batch_size=500,
+                                     update_conflicts=True,
+                                     unique_fields=['offer'],
+                                     update_fields=UPDATE_FIELDS)
+    # The signals bumped these versions when the offers changed, but pages
+    # rendered before this upsert may have cached the old entries under
+    # them; bump again once the entries are written.
+    product_ids = {entry.product_id for entry in entries}
+    if product_ids:
+        transaction.on_commit(lambda: bump_version(
+            LISTING_VERSION, *map(product_version_name, product_ids)))
+    return len(entries)
+
+
+def rebuild_catalog(batch_size=500):
+    count = 0
+    with transaction.atomic():
+        CatalogEntry.objects.all().delete()
+        batch = []
+        for offer in _offers().order_by('pk').iterator(
+                chunk_size=batch_size):
+            batch.append(catalog_entry(offer))
+            if len(batch) >= batch_size:
+                CatalogEntry.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        CatalogEntry.objects.bulk_create(batch)
+        # Every card and product page carries the taxonomy version.
+        transaction.on_commit(lambda: bump_version(LISTING_VERSION,
+                                                   TAXONOMY_VERSION))
+    return count + len(batch)
+
+
+def schedule_catalog_refresh(**ids):
+    # Ids touched inside one transaction are collected and handed to the
+    # worker as a single task once it commits.
+    pending = getattr(_pending, 'ids', None)
+    if pending is None:
+        pending = _pending.ids = {scope: set() for scope in SCOPES}
+    for scope, values in ids.items():
+        pending[scope].update(values)
+    transaction.on_commit(_flush_catalog_refresh)
+
+
+def _flush_catalog_refresh():
+    # shop.task imports this module for the task body
+    from shop.task import update_catalog_entries
+
+    pending = getattr(_pending, 'ids', None)
+    _pending.ids = None
+    if not pending or not any(pending.values()):
+        return
+    payload = {scope: sorted(values) for scope, values in pending.items()
+               if values}
+    try:
+        update_catalog_entries.delay(**payload)
+    except OperationalError:
+        refresh_catalog_entries(**payload)
@@ -0,0 +1,30 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Warning, register
+
+# Version stamps, idempotency keys and cache carts are shared between the
+# web processes and the Celery workers through the default cache; a
+# per-process cache keeps each of them to itself.
+MESSAGE = 'The default cache is not shared between processes.'
+HINT = 'Set CACHE_URL to a Redis server used by the web processes and the ' \
+       'Celery workers alike.'
+
+
+def _cache_is_local():
+    return isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    # A warning only, so that runserver and the test suite still start.
+    if _cache_is_local():
+        return [Warning(MESSAGE, hint=HINT, id='backend.W001')]
+    return []
+
+
+@register(deploy=True)
+def check_shared_cache_deploy(app_configs, **kwargs):
+    if _cache_is_local():
+        return [Error(MESSAGE, hint=HINT, id='backend.E001')]
+    return []
@@ -0,0 +1,54 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.contrib import messages
+
+from .cache import LISTING_VERSION, TAXONOMY_VERSION, cart_version_name, \
+    get_stamps, product_version_name
+from .cart import cart_count
+
+
+def _stamps(request, names):
+    # Computed once per request: the etag and last_modified callbacks of
+    # django.views.decorators.http.condition both land here.
+    if not hasattr(request, '_conditional_stamps'):
+        request._conditional_stamps = None
+        if request.method in ('GET', 'HEAD') and \
+                not len(messages.get_messages(request)):
+            user_id = request.user.pk if request.user.is_authenticated \
+                else None
+            if user_id is not None:
+                names = names + [cart_version_name(user_id)]
+            versions, modified = get_stamps(names)
+            # Session carts of anonymous visitors have no version; their
+            # badge count goes into the tag instead.
+            badge = None if user_id is not None else cart_count(request)
+            tag = repr((sorted(versions.items()), user_id, badge,
+                        sorted(request.GET.lists()),
+                        request.META.get('HTTP_ACCEPT', '')))
+            request._conditional_stamps = (
+                hashlib.md5(tag.encode()).hexdigest(),
+                datetime.fromtimestamp(int(modified), tz=timezone.utc))
+    return request._conditional_stamps
+
+
+def catalog_etag(request, *args, **kwargs):
+    stamps = _stamps(request, [LISTING_VERSION])
+    return stamps and stamps[0]
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    stamps = _stamps(request, [LISTING_VERSION])
+    return stamps and stamps[1]
+
+
+def product_etag(request, product_id, *args, **kwargs):
+    stamps = _stamps(request, [TAXONOMY_VERSION,
+                               product_version_name(product_id)])
+    return stamps and stamps[0]
+
+
+def product_last_modified(request, product_id, *args, **kwargs):
+    stamps = _stamps(request, [TAXONOMY_VERSION,
+                               product_version_name(product_id)])
+    return stamps and stamps[1]
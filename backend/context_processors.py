@@ -0,0 +1,6 @@
+from .cart import cart_count, is_cache_cart
+
+
+def cart(request):
+    return {'cart_count': cart_count(request),
+            'cache_cart': is_cache_cart()}
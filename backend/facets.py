@@ -0,0 +1,126 @@
+import hashlib
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, ExpressionWrapper, \
+    F, IntegerField, Value, When
+
+from .attributes import get_attribute_index
+from .cache import ATTRIBUTE_VERSION, CATALOG_VERSION, get_versions
+from .models import ProductInfo
+
+FACET_CACHE_TIMEOUT = 60 * 15
+PRICE_BUCKETS = 10
+
+
+def normalize_ids(values):
+    return tuple(sorted({int(v) for v in values if str(v).isdigit()}))
+
+
+def facet_counts(category_vars, brand_vars, price_min, price_max,
+                 price_min_abs, price_max_abs, attributes=()):
+    categories = normalize_ids(category_vars)
+    brands = normalize_ids(brand_vars)
+    filter_key = repr((categories, brands, price_min, price_max,
+                       price_min_abs, price_max_abs, attributes))
+    versions = get_versions([CATALOG_VERSION, ATTRIBUTE_VERSION])
+    key = 'facets:{}.{}:{}'.format(
+        versions[CATALOG_VERSION], versions[ATTRIBUTE_VERSION],
+        hashlib.md5(filter_key.encode()).hexdigest())
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute_facets(categories, brands, price_min, price_max,
+                                 price_min_abs, price_max_abs, attributes)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
+
+
+def _attribute_counts(index, categories, brands, price_min, price_max,
+                      attributes):
+    # Products left by the category, brand and price filters are counted
+    # against every value array, again leaving out the parameter's own
+    # filter.
+    if not index.parameters:
+        return []
+    offers = ProductInfo.objects.filter(price__range=(price_min, price_max))
+    if categories:
+        offers = offers.filter(category_id__in=categories)
+    if brands:
+        offers = offers.filter(brand_id__in=brands)
+    base = set(offers.values_list('product_id', flat=True).order_by())
+
+    counts = []
+    for parameter_id, name in sorted(index.parameters,
+                                     key=lambda item: item[1]):
+        others = index.product_ids(attributes, exclude=parameter_id)
+        candidates = base if others is None else base & others
+        counts.append({
+            'id': parameter_id,
+            'name': name,
+            'values': [
+                {'value': value,
+                 'key': f'{parameter_id}:{value}',
+                 'count': len(candidates.intersection(
+                     index.postings[(parameter_id, value)]))}
+                for value in index.values(parameter_id)],
+        })
+    return counts
+
+
+def _compute_facets(categories, brands, price_min, price_max,
+                    price_min_abs, price_max_abs, attributes=()):
+    # One grouped query over (category, brand, price bucket, in price range).
+    # Each facet is then counted with every active filter except its own, so
+    # checking a category still shows the counts of the other categories.
+    price_min_abs = price_min_abs or 0
+    span = max((price_max_abs or 0) - price_min_abs + 1, 1)
+    index = get_attribute_index()
+    rows = ProductInfo.objects.all()
+    product_ids = index.product_ids(attributes)
+    if product_ids is not None:
+        rows = rows.filter(product_id__in=product_ids)
+    rows = rows.annotate(
+        bucket=ExpressionWrapper(
+            (F('price') - price_min_abs) * PRICE_BUCKETS / span,
+            output_field=IntegerField()),
+        in_range=Case(
+            When(price__range=(price_min, price_max), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField())
+    ).values_list('category_id', 'brand_id', 'bucket', 'in_range').annotate(
+        count=Count('id')).order_by()
+
+    category_counts = Counter()
+    brand_counts = Counter()
+    bucket_counts = Counter()
+    total = 0
+    for category_id, brand_id, bucket, in_range, count in rows:
+        in_categories = not categories or category_id in categories
+        in_brands = not brands or brand_id in brands
+        if in_range and in_brands:
+            category_counts[category_id] += count
+        if in_range and in_categories:
+            brand_counts[brand_id] += count
+        if in_categories and in_brands:
+            bucket_counts[bucket] += count
+            if in_range:
+                total += count
+
+    price_buckets = []
+    for bucket in range(PRICE_BUCKETS):
+        low = price_min_abs + -(-bucket * span // PRICE_BUCKETS)
+        high = price_min_abs + -(-(bucket + 1) * span // PRICE_BUCKETS) - 1
+        if low > high:
+            continue
+        price_buckets.append({'min': low,
+                              'max': high,
+                              'count': bucket_counts[bucket]})
+
+    return {
+        'categories': dict(category_counts),
+        'brands': dict(brand_counts),
+        'price_buckets': price_buckets,
+        'attributes': _attribute_counts(index, categories, brands, price_min,
+                                        price_max, attributes),
+        'total': total,
+    }
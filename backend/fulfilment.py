@@ -0,0 +1,78 @@
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+# Order life cycle after checkout. 'new' is the cart and only checkout moves
+# an order out of it.
+STATUS_TRANSITIONS = {
+    'new': (),
+    'ordered': ('confirmed', 'canceled'),
+    'confirmed': ('assembled', 'canceled'),
+    'assembled': ('sent', 'canceled'),
+    'sent': ('delivered',),
+    'delivered': (),
+    'canceled': (),
+}
+SHOP_STATUSES = ('confirmed', 'assembled', 'sent', 'delivered', 'canceled')
+
+
+def source_statuses(status):
+    return [source for source, targets in STATUS_TRANSITIONS.items()
+            if status in targets]
+
+
+def shop_order_rows(shop, status=None):
+    # One row per order with the totals of the shop's own lines, grouped in
+    # the database.
+    items = OrderItem.objects.filter(shop=shop).exclude(order__status='new')
+    if status:
+        items = items.filter(order__status=status)
+    other_shops = OrderItem.objects.filter(
+        order_id=OuterRef('order_id')).exclude(shop=shop)
+    return items.values(
+        'order_id', 'order__status', 'order__created',
+        'order__user__email').annotate(
+        lines=Count('id'), items=Sum('quantity'),
+        total=Sum('total_price'),
+        shared=Exists(other_shops)).order_by('-order__created', '-order_id')
+
+
+def attach_shop_lines(shop, rows):
+    # The shop's lines of one page of orders, in one query.
+    rows = list(rows)
+    lines = {}
+    for item in OrderItem.objects.filter(
+            shop=shop, order_id__in=[row['order_id'] for row in rows]
+    ).select_related('product').order_by('pk'):
+        lines.setdefault(item.order_id, []).append(item)
+    for row in rows:
+        row['order_lines'] = lines.get(row['order_id'], [])
+        next_statuses = STATUS_TRANSITIONS[row['order__status']]
+        # Lines of other shops too: only the admin actions move the order.
+        row['locked'] = row['shared'] and bool(next_statuses)
+        row['next_statuses'] = () if row['shared'] else next_statuses
+    return rows
+
+
+def transition_orders(shop, order_ids, status):
+    # Moves the shop's orders that may go to status there with one UPDATE;
+    # orders in any other state, and orders that also have lines of other
+    # shops, are left alone. With shop=None (the admin actions) any order
+    # may move. Returns the ids of the orders that changed.
+    if status not in SHOP_STATUSES:
+        return []
+    orders = Order.objects.select_for_update().filter(
+        pk__in=order_ids, status__in=source_statuses(status))
+    if shop is not None:
+        orders = orders.filter(
+            pk__in=OrderItem.objects.filter(shop=shop).values('order_id')
+        ).exclude(
+            pk__in=OrderItem.objects.exclude(shop=shop).values('order_id'))
+    with transaction.atomic():
+        changed = list(orders.values_list('pk', flat=True))
+        if changed:
+            Order.objects.filter(pk__in=changed).update(
+                status=status, updated=timezone.now())
+    return changed
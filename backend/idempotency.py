@@ -0,0 +1,97 @@
+import re
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseRedirect
+from rest_framework.response import Response
+
+IDEMPOTENCY_TIMEOUT = 60 * 60 * 24
+IDEMPOTENCY_WAIT = 5
+IDEMPOTENCY_POLL = 0.1
+
+KEY_RE = re.compile(r'^[\w-]{8,64}$')
+PENDING = 'pending'
+
+
+def idempotency_key(request):
+    # Idempotency-Key header for API clients, idempotency_key field or query
+    # parameter for the forms and links of the site.
+    key = request.META.get('HTTP_IDEMPOTENCY_KEY') or \
+        request.POST.get('idempotency_key') or \
+        request.GET.get('idempotency_key')
+    return key if key and KEY_RE.match(key) else None
+
+
+def _owner(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    session_key = request.session.session_key
+    return session_key and f'session:{session_key}'
+
+
+def _freeze(response):
+    if isinstance(response, Response):
+        return 'data', response.status_code, response.data
+    if isinstance(response, HttpResponseRedirect):
+        return 'redirect', response.status_code, response['Location']
+    return None
+
+
+def _thaw(result):
+    kind, status, value = result
+    if kind == 'data':
+        return Response(value, status=status)
+    response = HttpResponseRedirect(value)
+    response.status_code = status
+    return response
+
+
+def _wait(cache_key):
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    while time.monotonic() < deadline:
+        result = cache.get(cache_key)
+        if result != PENDING:
+            return result
+        time.sleep(IDEMPOTENCY_POLL)
+    return PENDING
+
+
+def idempotent(scope):
+    # Runs the view once per (scope, user or session, key) for
+    # IDEMPOTENCY_TIMEOUT seconds. cache.add claims the key atomically; a
+    # replay gets the stored result back without running the view, and a
+    # duplicate that arrives while the first request is still running waits
+    # for its result. Requests without a key are not affected.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = idempotency_key(request)
+            owner = _owner(request) if key else None
+            if owner is None:
+                return view(request, *args, **kwargs)
+
+            cache_key = f'idempotency:{scope}:{owner}:{key}'
+            while not cache.add(cache_key, PENDING, IDEMPOTENCY_TIMEOUT):
+                result = _wait(cache_key)
+                if result == PENDING:
+                    return HttpResponse('Request is still in progress.',
+                                        status=409)
+                if result is not None:
+                    return _thaw(result)
+                # The first request failed and gave the key up: claim it
+                # again rather than run alongside another waiting duplicate.
+
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+            result = _freeze(response)
+            if result is None:
+                cache.delete(cache_key)
+            else:
+                cache.set(cache_key, result, IDEMPOTENCY_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
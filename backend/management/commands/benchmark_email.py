@@ -0,0 +1,125 @@
+import socketserver
+import threading
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+
+from shop.mailer import EmailConnectionPool, EmailOutbox
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    # Just enough SMTP for smtplib: every command is accepted and messages
+    # are thrown away. The greeting is delayed by the server's latency to
+    # stand in for the TCP, TLS and login round trips of a real host.
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        time.sleep(self.server.latency)
+        self.reply('220 localhost ESMTP stand-in')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.received += 1
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), StandInSMTPHandler)
+        self.latency = latency
+        self.received = 0
+
+
+class Command(BaseCommand):
+    help = 'Compare a connection per email with pooled connections and ' \
+           'batched sending against a local SMTP stand-in'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=50,
+                            help='Connection set-up delay, milliseconds')
+        parser.add_argument('--senders', type=int, default=8,
+                            help='Concurrent tasks sending one email each')
+
+    def handle(self, *args, **options):
+        server = StandInSMTPServer(options['latency'] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        connection_kwargs = {
+            'backend': 'django.core.mail.backends.smtp.EmailBackend',
+            'host': '127.0.0.1',
+            'port': server.server_address[1],
+            'username': '',
+            'password': '',
+            'use_tls': False,
+            'use_ssl': False,
+        }
+        messages = [EmailMessage('Order status update', 'text',
+                                 'shop@example.com', [f'user{i}@example.com'])
+                    for i in range(options['messages'])]
+
+        def connection_per_message():
+            # What msg.send() does: connect, send one message, quit.
+            for message in messages:
+                get_connection(**connection_kwargs).send_messages([message])
+
+        pool = EmailConnectionPool(1, 60, **connection_kwargs)
+        outbox = EmailOutbox(pool, 1, 100)
+
+        def pooled_per_message():
+            for message in messages:
+                pool.send_messages([message])
+
+        def pooled_batch():
+            pool.send_messages(messages)
+
+        def outbox_concurrent():
+            # Tasks sending one email each at the same time, as under the
+            # gevent pool; the outbox batches whatever has queued up.
+            def sender(chunk):
+                for message in chunk:
+                    outbox.send([message])
+
+            senders = [threading.Thread(target=sender, args=(
+                messages[i::options['senders']],))
+                for i in range(options['senders'])]
+            for thread in senders:
+                thread.start()
+            for thread in senders:
+                thread.join()
+
+        try:
+            for name, run in (
+                    ('connection per message', connection_per_message),
+                    ('pooled, one call per message', pooled_per_message),
+                    ('pooled, one batch', pooled_batch),
+                    ('outbox, concurrent senders', outbox_concurrent)):
+                received = server.received
+                started = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{name:<30} {server.received - received:>6} messages '
+                    f'{elapsed:8.3f} s {len(messages) / elapsed:10.1f} msg/s')
+        finally:
+            pool.close()
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from backend.search_index import build_search_index_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Build the in-memory product search index and save its snapshot'
+
+    def handle(self, *args, **options):
+        count = build_search_index_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'Search index snapshot saved: {count} products'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from backend.catalog import rebuild_catalog
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized catalog read table from offers'
+
+    def handle(self, *args, **options):
+        count = rebuild_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f'Catalog rebuilt: {count} entries'))
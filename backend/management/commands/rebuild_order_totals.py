@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from backend.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored order totals from order items'
+
+    def handle(self, *args, **options):
+        count = Order.recompute_totals()
+        self.stdout.write(self.style.SUCCESS(
+            f'Totals recomputed for {count} orders'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from backend.models import ProductRating
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-product rating summaries from comments'
+
+    def handle(self, *args, **options):
+        count = ProductRating.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rating summaries rebuilt for {count} products'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from backend.search import create_search_index, is_full_text_available, \
+    update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recompute product full-text search vectors (PostgreSQL only)'
+
+    def handle(self, *args, **options):
+        if not is_full_text_available():
+            self.stdout.write(self.style.WARNING(
+                'Full-text search needs PostgreSQL, nothing to do'))
+            return
+        create_search_index()
+        count = update_search_vectors()
+        self.stdout.write(self.style.SUCCESS(
+            f'Search vectors updated for {count} products'))
@@ -1,8 +1,12 @@
-from django.db import models
-from django.db.models import Avg
+from django.db import models, transaction
+from django.db.models import Case, DecimalField, F, FloatField, OuterRef, \
+    Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
+from django.utils import timezone
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.files.storage import FileSystemStorage
 
 storage = FileSystemStorage(location=settings.STORAGE)
@@ -17,6 +21,14 @@ STATUS_CHOICES = (
     ('canceled', 'Отменен'),
 )
 
+RATING_FIELDS = {
+    1: 'count_one',
+    2: 'count_two',
+    3: 'count_three',
+    4: 'count_four',
+    5: 'count_five',
+}
+
 
 class Brand(models.Model):
     name = models.CharField('Торговая марка',
@@ -98,6 +110,8 @@ class Product(models.Model):
                                         blank=True)
     description = models.TextField(verbose_name='Описание',
                                    blank=True)
+    search_vector = SearchVectorField(null=True,
+                                      editable=False)
 
     class Meta:
         verbose_name = 'Товар'
@@ -107,29 +121,131 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def build_search_vector():
+        return SearchVector('name', weight='A',
+                            config=settings.SEARCH_CONFIG) + \
+            SearchVector('description', weight='B',
+                         config=settings.SEARCH_CONFIG)
+
+    def _rating_value(self, field, default=0):
+        try:
+            return getattr(self.rating, field)
+        except ProductRating.DoesNotExist:
+            return default
+
     @property
     def average_rating(self):
-        return self.comments.all().aggregate(Avg('rating'))['rating__avg']
+        return self._rating_value('average', default=None)
+
+    @property
+    def count_rating(self):
+        return self._rating_value('rating_count')
 
     @property
     def count_rating_five(self):
-        return self.comments.filter(rating=5).count()
+        return self._rating_value('count_five')
 
     @property
     def count_rating_four(self):
-        return self.comments.filter(rating=4).count()
+        return self._rating_value('count_four')
 
     @property
     def count_rating_three(self):
-        return self.comments.filter(rating=3).count()
+        return self._rating_value('count_three')
 
     @property
     def count_rating_two(self):
-        return self.comments.filter(rating=2).count()
+        return self._rating_value('count_two')
 
     @property
     def count_rating_one(self):
-        return self.comments.filter(rating=1).count()
+        return self._rating_value('count_one')
+
+
+class ProductRating(models.Model):
+    product = models.OneToOneField(Product,
+                                   verbose_name='Товар',
+                                   related_name='rating',
+                                   primary_key=True,
+                                   on_delete=models.CASCADE)
+    count_one = models.IntegerField(verbose_name='Оценок 1',
+                                    default=0)
+    count_two = models.IntegerField(verbose_name='Оценок 2',
+                                    default=0)
+    count_three = models.IntegerField(verbose_name='Оценок 3',
+                                      default=0)
+    count_four = models.IntegerField(verbose_name='Оценок 4',
+                                     default=0)
+    count_five = models.IntegerField(verbose_name='Оценок 5',
+                                     default=0)
+    rating_count = models.IntegerField(verbose_name='Всего оценок',
+                                       default=0)
+    rating_sum = models.IntegerField(verbose_name='Сумма оценок',
+                                     default=0)
+    average = models.FloatField(verbose_name='Средняя оценка',
+                                null=True,
+                                blank=True)
+
+    class Meta:
+        verbose_name = 'Рейтинг товара'
+        verbose_name_plural = 'Рейтинги товаров'
+
+    def __str__(self):
+        return f'{self.product_id}: {self.average} ({self.rating_count})'
+
+    @classmethod
+    def apply(cls, product_id, rating, delta):
+        # Shift the summary by one review (delta = 1 or -1). The average is
+        # computed from the pre-update column values inside the same UPDATE.
+        # Ratings outside 1..5 are left out here as in rebuild, so a bad row
+        # that got in some other way never fails the save that wrote it.
+        field = RATING_FIELDS.get(rating)
+        if field is None:
+            return
+        with transaction.atomic():
+            # A removal never creates the row: when the product itself is
+            # being deleted, its cascaded reviews must not bring it back.
+            if delta > 0:
+                cls.objects.get_or_create(product_id=product_id)
+            cls.objects.filter(product_id=product_id).update(
+                **{field: F(field) + delta},
+                rating_count=F('rating_count') + delta,
+                rating_sum=F('rating_sum') + rating * delta,
+                average=Case(
+                    When(rating_count=-delta, then=Value(None)),
+                    default=Cast(F('rating_sum') + rating * delta,
+                                 FloatField()) /
+                    Cast(F('rating_count') + delta, FloatField()),
+                    output_field=FloatField()))
+
+    @classmethod
+    def rebuild(cls, product_ids=None):
+        from authorization.models import Comment
+
+        comments = Comment.objects.filter(product__isnull=False,
+                                          rating__in=RATING_FIELDS)
+        summaries = cls.objects.all()
+        if product_ids is not None:
+            comments = comments.filter(product_id__in=product_ids)
+            summaries = summaries.filter(product_id__in=product_ids)
+
+        totals = {}
+        for product_id, rating, count in comments.values_list(
+                'product_id', 'rating').annotate(
+                count=models.Count('id')).order_by():
+            summary = totals.setdefault(product_id,
+                                        cls(product_id=product_id))
+            setattr(summary, RATING_FIELDS[rating], count)
+            summary.rating_count += count
+            summary.rating_sum += rating * count
+        for summary in totals.values():
+            summary.average = summary.rating_sum / summary.rating_count
+
+        with transaction.atomic():
+            summaries.delete()
+            cls.objects.bulk_create(totals.values(), batch_size=500)
+        return len(totals)
 
 
 class ProductsParameters(models.Model):
@@ -155,6 +271,9 @@ class ProductInfo(models.Model):
                                  blank=True,
                                  on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(verbose_name='Количество')
+    reserved = models.PositiveIntegerField(default=0,
+                                           verbose_name='Зарезервировано '
+                                                        'в корзинах')
     price = models.PositiveIntegerField(verbose_name='Цена')
     price_rrc = models.PositiveIntegerField(verbose_name='Рекомендуемая '
                                                          'розничная цена')
@@ -177,11 +296,92 @@ class ProductInfo(models.Model):
             models.UniqueConstraint(fields=['product', 'shop'],
                                     name='unique_product_info'),
         ]
+        indexes = [
+            models.Index(fields=['price', 'id'],
+                         name='product_info_price_id_idx'),
+        ]
         ordering = ('product', 'price', 'quantity')
 
     def __str__(self):
         return f'{self.product.name} ({self.shop.name})'
 
+    @property
+    def available(self):
+        return self.quantity - self.reserved
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._price_state = (instance.__dict__.get('price'),
+                                 instance.__dict__.get('category_id'),
+                                 instance.__dict__.get('brand_id'))
+        return instance
+
+
+class CatalogEntry(models.Model):
+    offer = models.OneToOneField(ProductInfo,
+                                 verbose_name='Предложение',
+                                 related_name='catalog_entry',
+                                 primary_key=True,
+                                 on_delete=models.CASCADE)
+    product = models.ForeignKey(Product,
+                                verbose_name='Товар',
+                                related_name='+',
+                                on_delete=models.CASCADE)
+    brand = models.ForeignKey(Brand,
+                              verbose_name='Торговая марка',
+                              related_name='+',
+                              on_delete=models.CASCADE)
+    category = models.ForeignKey(Category,
+                                 verbose_name='Категория',
+                                 related_name='+',
+                                 on_delete=models.CASCADE)
+    shop = models.ForeignKey(Shop,
+                             verbose_name='Магазин',
+                             related_name='+',
+                             on_delete=models.CASCADE)
+    product_name = models.CharField(max_length=100,
+                                    verbose_name='Название товара')
+    description = models.TextField(verbose_name='Описание',
+                                   blank=True)
+    image = models.ImageField(upload_to='products/',
+                              blank=True)
+    brand_name = models.CharField(max_length=80,
+                                  verbose_name='Торговая марка')
+    category_name = models.CharField(max_length=50,
+                                     verbose_name='Категория')
+    shop_name = models.CharField(max_length=50,
+                                 verbose_name='Магазин')
+    model = models.CharField(max_length=100,
+                             verbose_name='Модель')
+    quantity = models.PositiveIntegerField(verbose_name='Количество')
+    price = models.PositiveIntegerField(verbose_name='Цена')
+    price_rrc = models.PositiveIntegerField(verbose_name='Рекомендуемая '
+                                                         'розничная цена')
+    average_rating = models.FloatField(verbose_name='Средняя оценка',
+                                       null=True,
+                                       blank=True)
+    rating_count = models.IntegerField(verbose_name='Всего оценок',
+                                       default=0)
+    refreshed = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Запись каталога'
+        verbose_name_plural = 'Каталог (витрина)'
+        indexes = [
+            models.Index(fields=['price', 'offer'],
+                         name='catalog_price_idx'),
+            models.Index(fields=['product_name', 'offer'],
+                         name='catalog_name_idx'),
+            models.Index(fields=['category', 'price'],
+                         name='catalog_category_price_idx'),
+            models.Index(fields=['brand', 'price'],
+                         name='catalog_brand_price_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_name} ({self.shop_name})'
+
 
 class Order(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
@@ -201,6 +401,10 @@ class Order(models.Model):
     total_items_count = models.IntegerField(verbose_name='Общее количество '
                                                          'товаров в заказе',
                                             default=0)
+    total_price = models.DecimalField(default=0,
+                                      max_digits=12,
+                                      decimal_places=2,
+                                      verbose_name='Общая стоимость заказа')
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=False)
@@ -209,11 +413,40 @@ class Order(models.Model):
         verbose_name = 'Заказ'
         verbose_name_plural = "Список заказов"
         ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['user', 'created', 'id'],
+                         name='order_user_created_idx'),
+        ]
 
     def __str__(self):
         return f'{str(self.created)} : {self.user} : {self.status}' \
                f' {self.is_active}'
 
+    @classmethod
+    def apply_item_delta(cls, order_id, quantity, price):
+        # Shift the persisted totals by one item change in a single UPDATE,
+        # whatever the size of the order.
+        cls.objects.filter(pk=order_id).update(
+            total_items_count=F('total_items_count') + quantity,
+            total_price=F('total_price') + price,
+            updated=timezone.now())
+
+    @classmethod
+    def recompute_totals(cls, order_ids=None):
+        items = OrderItem.objects.filter(
+            order=OuterRef('pk')).order_by().values('order')
+        orders = cls.objects.all()
+        if order_ids is not None:
+            orders = orders.filter(pk__in=order_ids)
+        return orders.update(
+            total_items_count=Coalesce(Subquery(
+                items.annotate(total=Sum('quantity')).values('total')),
+                Value(0)),
+            total_price=Coalesce(Subquery(
+                items.annotate(total=Sum('total_price')).values('total')),
+                Value(0), output_field=DecimalField()),
+            updated=timezone.now())
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order,
@@ -260,7 +493,7 @@ class OrderItem(models.Model):
         return str(self.product)
 
     def save(self, *args, **kwargs):
-        product = ProductInfo.objects.get(product=self.product)
+        product = ProductInfo.objects.get(product_id=self.product_id)
 
         price_per_item = product.price
         self.price_per_item = price_per_item
@@ -268,28 +501,73 @@ class OrderItem(models.Model):
 
         super(OrderItem, self).save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._total_state = (instance.__dict__.get('order_id'),
+                                 instance.__dict__.get('quantity'),
+                                 instance.__dict__.get('total_price'))
+        return instance
+
 
 @receiver(post_save, sender=OrderItem)
 def item_in_order_post_save(sender, instance, created, **kwargs):
-    all_items_in_order = OrderItem.objects.filter(order=instance.order)
-    order_total_price = 0
-    total_items_count_in_order = 0
-    for item in all_items_in_order:
-        order_total_price += item.total_price
-        total_items_count_in_order += item.quantity
-    instance.order.total_price = order_total_price
-    instance.order.total_items_count = total_items_count_in_order
-    instance.order.save(force_update=True)
+    new_state = (instance.order_id, instance.quantity, instance.total_price)
+    old_state = None if created else getattr(instance, '_total_state', None)
+    if created:
+        _apply_item_delta(instance, instance.order_id, instance.quantity,
+                          instance.total_price)
+    elif old_state is None or None in old_state:
+        Order.recompute_totals([instance.order_id])
+    elif old_state != new_state:
+        old_order_id, old_quantity, old_price = old_state
+        if old_order_id != instance.order_id:
+            Order.apply_item_delta(old_order_id, -old_quantity, -old_price)
+            _apply_item_delta(instance, instance.order_id, instance.quantity,
+                              instance.total_price)
+        else:
+            _apply_item_delta(instance, instance.order_id,
+                              instance.quantity - old_quantity,
+                              instance.total_price - old_price)
+    instance._total_state = new_state
 
 
 @receiver(post_delete, sender=OrderItem)
-def item_in_order_post_delete(sender, instance, created=False, **kwargs):
-    all_items_in_order = OrderItem.objects.filter(order=instance.order)
-    order_total_price = 0
-    total_items_count_in_order = 0
-    for item in all_items_in_order:
-        order_total_price += item.total_price
-        total_items_count_in_order += item.quantity
-    instance.order.total_price = order_total_price
-    instance.order.total_items_count = total_items_count_in_order
-    instance.order.save(force_update=True)
+def item_in_order_post_delete(sender, instance, **kwargs):
+    order_id, quantity, price = getattr(instance, '_total_state', (
+        instance.order_id, instance.quantity, instance.total_price))
+    if None in (quantity, price):
+        Order.recompute_totals([order_id])
+    else:
+        _apply_item_delta(instance, order_id, -quantity, -price)
+
+
+def _apply_item_delta(instance, order_id, quantity, price):
+    Order.apply_item_delta(order_id, quantity, price)
+    # Keep an already loaded order object in step with the row.
+    if OrderItem.order.is_cached(instance) and \
+            instance.order.pk == order_id:
+        instance.order.total_items_count += quantity
+        instance.order.total_price += price
+
+
+class StockHold(models.Model):
+    item = models.OneToOneField(OrderItem,
+                                verbose_name='Товар в заказе',
+                                related_name='hold',
+                                primary_key=True,
+                                on_delete=models.CASCADE)
+    offer = models.ForeignKey(ProductInfo,
+                              verbose_name='Информация о товаре',
+                              related_name='holds',
+                              on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(verbose_name='Количество')
+    expires = models.DateTimeField(verbose_name='Действует до',
+                                   db_index=True)
+
+    class Meta:
+        verbose_name = 'Резерв товара'
+        verbose_name_plural = 'Резервы товаров'
+
+    def __str__(self):
+        return f'{self.offer_id}: {self.quantity} до {self.expires}'
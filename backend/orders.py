@@ -0,0 +1,31 @@
+from .models import Order, OrderItem
+from .pagination import keyset_page
+from authorization.models import Comment
+
+ORDERS_PAGE_SIZE = 10
+USER_REVIEWS_PAGE_SIZE = 10
+
+
+def order_history_page(user_id, cursor=None, per_page=ORDERS_PAGE_SIZE):
+    # Newest first along order_user_created_idx. The totals are the
+    # persisted columns, so a page never touches the order items.
+    return keyset_page(Order.objects.filter(user_id=user_id), '-created',
+                       per_page, cursor)
+
+
+def user_review_page(user_id, cursor=None, per_page=USER_REVIEWS_PAGE_SIZE):
+    return keyset_page(Comment.objects.filter(
+        user_id=user_id).select_related('product'), '-posted', per_page,
+        cursor)
+
+
+def load_order_detail(order_id, user_id):
+    # Two queries whatever the size of the order: the order with its
+    # contact and totals, and its items with everything they are shown with.
+    order = Order.objects.select_related('contact').filter(
+        pk=order_id, user_id=user_id).first()
+    if order is None:
+        return None
+    items = list(OrderItem.objects.filter(order=order).select_related(
+        'product', 'shop', 'brand').order_by('pk'))
+    return {'order': order, 'products': items}
@@ -0,0 +1,131 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from rest_framework.pagination import PageNumberPagination
+
+SORT_OPTIONS = ('id', '-id', 'price', '-price', 'product__name',
+                '-product__name')
+MAX_PAGE_SIZE = 100
+
+
+def normalize_sort(sort_by):
+    return sort_by if sort_by in SORT_OPTIONS else 'id'
+
+
+def normalize_page_size(paginate_by, default=20):
+    try:
+        paginate_by = int(paginate_by)
+    except (TypeError, ValueError):
+        return default
+    return min(max(paginate_by, 1), MAX_PAGE_SIZE)
+
+
+class CountedPaginator(Paginator):
+    # Paginator that trusts a total computed elsewhere (e.g. the cached facet
+    # total) instead of running its own COUNT(*).
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @property
+    def count(self):
+        return self._count
+
+
+class CatalogPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'paginate_by'
+    max_page_size = MAX_PAGE_SIZE
+
+
+def _cursor_value(value):
+    # Datetimes keep their microseconds, which DjangoJSONEncoder would drop.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not a cursor value')
+
+
+def encode_cursor(direction, value, pk):
+    raw = json.dumps([direction, value, pk], separators=(',', ':'),
+                     default=_cursor_value)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, value, pk = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(pk, int):
+        return None
+    return direction, value, pk
+
+
+def _sort_value(obj, field):
+    for attr in field.split('__'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def keyset_page(queryset, sort_by, per_page, cursor=None):
+    # Seek pagination on (sort column, pk): every page is an indexed range
+    # scan of per_page + 1 rows, whatever its depth.
+    field = sort_by.lstrip('-')
+    descending = sort_by.startswith('-')
+    position = decode_cursor(cursor) if cursor else None
+    backwards = position is not None and position[0] == 'prev'
+
+    ordering = [sort_by, '-pk' if descending else 'pk']
+    if backwards:
+        ordering = [o[1:] if o.startswith('-') else f'-{o}'
+                    for o in ordering]
+
+    if position is not None:
+        _, value, pk = position
+        lookup = 'lt' if descending != backwards else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{lookup}': value}) |
+            Q(**{field: value, f'pk__{lookup}': pk}))
+
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = previous_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if has_more or backwards:
+            next_cursor = encode_cursor('next', _sort_value(last, field),
+                                        last.pk)
+        if (has_more and backwards) or (position is not None
+                                        and not backwards):
+            previous_cursor = encode_cursor('prev',
+                                            _sort_value(first, field),
+                                            first.pk)
+    return KeysetPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max, \
+    Min
+
+from .models import ProductInfo
+
+PRICE_BOUNDS_KEY = 'price_bounds'
+PRICE_BOUNDS_TIMEOUT = 60 * 60
+HISTOGRAM_BUCKETS = 20
+
+
+def price_bounds():
+    bounds = cache.get(PRICE_BOUNDS_KEY)
+    if bounds is None:
+        bounds = _compute_price_bounds()
+        cache.set(PRICE_BOUNDS_KEY, bounds, PRICE_BOUNDS_TIMEOUT)
+    return bounds
+
+
+def filtered_price_bounds(bounds, categories=(), brands=()):
+    # Any offer matching both filters lies inside the union of its
+    # categories' ranges and inside the union of its brands' ranges, so the
+    # intersection of the two is a safe slider range.
+    low, high = bounds['min'], bounds['max']
+    for selected, ranges in ((categories, bounds['categories']),
+                             (brands, bounds['brands'])):
+        selected = [ranges[i] for i in selected if i in ranges]
+        if selected:
+            low = max(low, min(r[0] for r in selected))
+            high = min(high, max(r[1] for r in selected))
+    if low is None or low > high:
+        return bounds['min'], bounds['max']
+    return low, high
+
+
+def _compute_price_bounds():
+    categories = {
+        category_id: (low, high)
+        for category_id, low, high in ProductInfo.objects.values_list(
+            'category_id').annotate(Min('price'), Max('price')).order_by()}
+    brands = {
+        brand_id: (low, high)
+        for brand_id, low, high in ProductInfo.objects.values_list(
+            'brand_id').annotate(Min('price'), Max('price')).order_by()}
+    bounds = {
+        'min': min((r[0] for r in categories.values()), default=None),
+        'max': max((r[1] for r in categories.values()), default=None),
+        'categories': categories,
+        'brands': brands,
+        'histogram': [0] * HISTOGRAM_BUCKETS,
+    }
+    if bounds['min'] is not None:
+        span = bounds['max'] - bounds['min'] + 1
+        rows = ProductInfo.objects.annotate(
+            bucket=ExpressionWrapper(
+                (F('price') - bounds['min']) * HISTOGRAM_BUCKETS / span,
+                output_field=IntegerField())
+        ).values_list('bucket').annotate(Count('id')).order_by()
+        for bucket, count in rows:
+            bounds['histogram'][bucket] = count
+    return bounds
+
+
+def price_histogram(bounds):
+    if bounds['min'] is None:
+        return []
+    span = bounds['max'] - bounds['min'] + 1
+    peak = max(bounds['histogram']) or 1
+    return [{'min': bounds['min'] + -(-i * span // HISTOGRAM_BUCKETS),
+             'count': count,
+             'height': round(count * 100 / peak)}
+            for i, count in enumerate(bounds['histogram'])]
+
+
+def invalidate_price_bounds():
+    cache.delete(PRICE_BOUNDS_KEY)
+
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+
+from .cache import TAXONOMY_VERSION, get_versions, product_version_name
+from .models import ProductInfo, ProductsParameters
+from .pagination import keyset_page
+from authorization.models import Comment
+
+PRODUCT_DETAIL_TIMEOUT = 60 * 15
+REVIEWS_PAGE_SIZE = 10
+
+
+def review_page(product_id, cursor=None, per_page=REVIEWS_PAGE_SIZE):
+    # Newest first, seeking on (posted, id) along comment_product_posted_idx.
+    return keyset_page(Comment.objects.filter(
+        product_id=product_id).select_related('user'), '-posted', per_page,
+        cursor)
+
+
+def _load_bundle(product_id):
+    # Three queries whatever the product: the offer with everything it is
+    # shown with, its parameters, and the first page of reviews with their
+    # authors. The rest of the reviews are loaded from the reviews endpoint.
+    product_info = ProductInfo.objects.select_related(
+        'product__rating', 'brand', 'category', 'shop').filter(
+        product_id=product_id).order_by('pk').first()
+    if product_info is None:
+        return None
+    parameters = list(ProductsParameters.objects.filter(
+        product_id=product_id).select_related('parameter').order_by('pk'))
+    reviews = review_page(product_id)
+    return {
+        'product_info': product_info,
+        'parameters': parameters,
+        'comments': reviews.object_list,
+        'comments_cursor': reviews.next_cursor,
+        'comment_count': product_info.product.count_rating,
+    }
+
+
+def load_product_detail(product_id):
+    # Cached under the product and taxonomy versions, which every write to
+    # the rows in the bundle bumps (see backend.signals).
+    product_version = product_version_name(product_id)
+    versions = get_versions([product_version, TAXONOMY_VERSION])
+    key = f'product_detail:{product_id}:{versions[product_version]}:' \
+          f'{versions[TAXONOMY_VERSION]}'
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = _load_bundle(product_id)
+        if bundle is not None:
+            cache.set(key, bundle, PRODUCT_DETAIL_TIMEOUT)
+    return bundle
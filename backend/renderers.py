@@ -0,0 +1,14 @@
+import ujson
+
+from rest_framework.renderers import BaseRenderer
+
+
+class UJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return ujson.dumps(data, ensure_ascii=False, default=str).encode()
@@ -0,0 +1,100 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .cache import bump_version, product_version_name
+from .catalog import schedule_catalog_refresh
+from .models import ProductInfo, StockHold
+
+
+def hold_expiry():
+    return timezone.now() + timedelta(seconds=settings.CART_HOLD_TTL)
+
+
+def _availability_changed(offer_ids):
+    # reserved is moved with UPDATE, which sends no ProductInfo signal: the
+    # product pages and the catalog entries (quantity - reserved) are
+    # refreshed here instead, once the transaction commits.
+    product_ids = set(ProductInfo.objects.filter(
+        pk__in=offer_ids).values_list('product_id', flat=True))
+    if product_ids:
+        transaction.on_commit(lambda: bump_version(
+            *map(product_version_name, product_ids)))
+        schedule_catalog_refresh(product_ids=product_ids)
+
+
+def _shift_reserved(deltas):
+    # One UPDATE for any number of offers.
+    deltas = {offer_id: delta for offer_id, delta in deltas.items() if delta}
+    if deltas:
+        ProductInfo.objects.filter(pk__in=deltas).update(
+            reserved=F('reserved') + Case(
+                *[When(pk=offer_id, then=Value(delta))
+                  for offer_id, delta in deltas.items()],
+                output_field=IntegerField()))
+        _availability_changed(deltas)
+
+
+def hold_stock(order, lines):
+    # Makes each (order item, offer) line hold item.quantity units and
+    # renews the expiry of every hold of the order. Availability is
+    # quantity - reserved on the offer row, so each check is one conditional
+    # UPDATE. Returns the items that could not be held; the caller's
+    # transaction should then be rolled back.
+    expires = hold_expiry()
+    holds = {hold.item_id: hold for hold in
+             StockHold.objects.select_for_update().filter(item__order=order)}
+    shortages = []
+    releases = Counter()
+    taken = []
+    new_holds = []
+    for item, offer in sorted(lines, key=lambda line: line[1].pk):
+        hold = holds.get(item.pk)
+        delta = item.quantity - (hold.quantity if hold else 0)
+        if delta > 0 and not ProductInfo.objects.filter(
+                pk=offer.pk, quantity__gte=F('reserved') + delta).update(
+                reserved=F('reserved') + delta):
+            shortages.append(item)
+            continue
+        if delta > 0:
+            taken.append(offer.pk)
+        if delta < 0:
+            releases[offer.pk] += delta
+        if hold is None:
+            new_holds.append(StockHold(item=item, offer=offer,
+                                       quantity=item.quantity,
+                                       expires=expires))
+        else:
+            hold.quantity = item.quantity
+    if shortages:
+        return shortages
+
+    _shift_reserved(releases)
+    _availability_changed(taken)
+    for hold in holds.values():
+        hold.expires = expires
+    StockHold.objects.bulk_create(new_holds)
+    StockHold.objects.bulk_update(holds.values(), ['quantity', 'expires'])
+    return []
+
+
+def release_holds(holds):
+    with transaction.atomic():
+        locked = list(holds.select_for_update(skip_locked=True).values_list(
+            'pk', 'offer_id', 'quantity'))
+        if not locked:
+            return 0
+        releases = Counter()
+        for _, offer_id, quantity in locked:
+            releases[offer_id] -= quantity
+        _shift_reserved(releases)
+        StockHold.objects.filter(pk__in=[pk for pk, _, _ in locked]).delete()
+    return len(locked)
+
+
+def release_expired_holds():
+    return release_holds(StockHold.objects.filter(expires__lte=timezone.now()))
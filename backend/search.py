@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import Product
+from .search_index import get_search_index
+
+SEARCH_INDEX_NAME = 'backend_product_search_vector_idx'
+
+
+def is_full_text_available():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(product_ids=None):
+    if not is_full_text_available():
+        return 0
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    return products.update(search_vector=Product.build_search_vector())
+
+
+def create_search_index(**kwargs):
+    if not is_full_text_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} '
+            f'ON {Product._meta.db_table} USING gin (search_vector)')
+
+
+class RankedProducts:
+    # Sequence over ranked product ids that loads only the rows of the
+    # slice being displayed, so Paginator can page it like a queryset.
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def __getitem__(self, item):
+        ids = self.product_ids[item]
+        if not isinstance(item, slice):
+            return Product.objects.only('id', 'name', 'description').get(
+                pk=ids)
+        products = Product.objects.only('id', 'name',
+                                        'description').in_bulk(ids)
+        return [products[pk] for pk in ids if pk in products]
+
+
+def search_products(query):
+    if settings.SEARCH_BACKEND == 'memory':
+        return RankedProducts(get_search_index().search(query))
+
+    products = Product.objects.only('id', 'name', 'description')
+    if is_full_text_available():
+        search_query = SearchQuery(query,
+                                   search_type='websearch',
+                                   config=settings.SEARCH_CONFIG)
+        return products.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', 'id')
+
+    # Fallback for databases without full-text search (local SQLite runs):
+    # every term must match the name or the description, and terms found
+    # in the name rank higher.
+    terms = query.split()
+    if not terms:
+        return products.none()
+    for term in terms:
+        products = products.filter(Q(name__icontains=term) |
+                                   Q(description__icontains=term))
+    rank = sum((Case(When(name__icontains=term, then=Value(2)),
+                     default=Value(1),
+                     output_field=IntegerField()) for term in terms),
+               Value(0))
+    return products.annotate(rank=rank).order_by('-rank', 'id')
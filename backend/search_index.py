@@ -0,0 +1,187 @@
+import gzip
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .cache import VersionedIndex, get_version
+from .models import Product
+
+SEARCH_INDEX_VERSION = 'search_index'
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    NAME_WEIGHT = 2.0
+    DESCRIPTION_WEIGHT = 1.0
+    SIMILARITY_THRESHOLD = 0.4
+
+    def __init__(self, version=None):
+        self.version = version
+        self._documents = {}
+        self._postings = defaultdict(dict)
+        self._grams = {}
+        self._gram_tokens = defaultdict(set)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, product_id, name, description):
+        with self._lock:
+            self._remove(product_id)
+            weights = dict.fromkeys(tokenize(description),
+                                    self.DESCRIPTION_WEIGHT)
+            weights.update(dict.fromkeys(tokenize(name), self.NAME_WEIGHT))
+            self._documents[product_id] = weights
+            for token, weight in weights.items():
+                if token not in self._grams:
+                    self._grams[token] = grams = trigrams(token)
+                    for gram in grams:
+                        self._gram_tokens[gram].add(token)
+                self._postings[token][product_id] = weight
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def _remove(self, product_id):
+        for token in self._documents.pop(product_id, ()):
+            posting = self._postings[token]
+            posting.pop(product_id, None)
+            if posting:
+                continue
+            del self._postings[token]
+            for gram in self._grams.pop(token):
+                tokens = self._gram_tokens[gram]
+                tokens.discard(token)
+                if not tokens:
+                    del self._gram_tokens[gram]
+
+    def _expand(self, term):
+        # Index tokens within trigram (Jaccard) similarity of the term;
+        # an exact hit scores 1.0, a typo proportionally less.
+        grams = trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._gram_tokens.get(gram, ()))
+        for token, common in shared.items():
+            similarity = common / (len(grams) + len(self._grams[token]) -
+                                   common)
+            if similarity >= self.SIMILARITY_THRESHOLD:
+                yield token, similarity
+
+    def search(self, query, limit=None):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for token, similarity in self._expand(term):
+                    for product_id, weight in self._postings[token].items():
+                        score = similarity * weight
+                        if score > term_scores.get(product_id, 0):
+                            term_scores[product_id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {product_id: scores[product_id] + score
+                              for product_id, score in term_scores.items()
+                              if product_id in scores}
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [product_id for product_id, _ in ranked[:limit]]
+
+    def dump(self, path, version):
+        with self._lock:
+            documents = {
+                product_id: [
+                    [t for t, w in weights.items() if w == self.NAME_WEIGHT],
+                    [t for t, w in weights.items() if w != self.NAME_WEIGHT]]
+                for product_id, weights in self._documents.items()}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, 'wt', encoding='utf-8') as snapshot:
+            json.dump({'version': version,
+                       'documents': documents}, snapshot,
+                      separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as snapshot:
+            data = json.load(snapshot)
+        index = cls()
+        for product_id, (name, description) in data['documents'].items():
+            index.add(int(product_id), ' '.join(name), ' '.join(description))
+        return index, data['version']
+
+    @classmethod
+    def from_database(cls):
+        index = cls()
+        for product_id, name, description in Product.objects.values_list(
+                'id', 'name', 'description').order_by().iterator():
+            index.add(product_id, name, description)
+        return index
+
+
+def _load_snapshot(version):
+    # The snapshot records the index version it was built at; any product
+    # change since then has bumped the version and makes it unusable.
+    path = settings.SEARCH_INDEX_SNAPSHOT
+    if not os.path.exists(path):
+        return None
+    try:
+        index, snapshot_version = ProductSearchIndex.load(path)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if snapshot_version != version:
+        return None
+    return index
+
+
+# Built lazily on first use, from the snapshot when no product changed
+# since it was taken, and rebuilt whenever another process has changed
+# products.
+_index = VersionedIndex(SEARCH_INDEX_VERSION, ProductSearchIndex.from_database,
+                        load=_load_snapshot)
+
+
+def get_search_index():
+    return _index.get()
+
+
+def build_search_index_snapshot():
+    # Read before the table, so that a change made during the build leaves
+    # the snapshot behind the version.
+    version = get_version(SEARCH_INDEX_VERSION)
+    index = ProductSearchIndex.from_database()
+    index.dump(settings.SEARCH_INDEX_SNAPSHOT, version)
+    return len(index)
+
+
+def index_product_change(product, deleted=False):
+    product_id, name, description = product.pk, product.name, \
+        product.description
+
+    def change(index):
+        if deleted:
+            index.remove(product_id)
+        else:
+            index.add(product_id, name, description)
+
+    _index.patch_on_commit(change)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from authorization.models import User, Contact
-from .models import Shop, Category, Product, ProductInfo, Parameter, Order, OrderItem
+from authorization.models import Comment, Contact, User
+from .models import Brand, Shop, Category, Product, ProductInfo, Parameter, \
+    ProductsParameters, Order, OrderItem
 
 
 class ContactSerializer(serializers.ModelSerializer):
@@ -50,10 +51,49 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ('search_vector',)
+        read_only_fields = ('id',)
+
+
+class BrandSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Brand
+        fields = ('id', 'name',)
         read_only_fields = ('id',)
 
 
+class ProductParameterSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='parameter.name')
+
+    class Meta:
+        model = ProductsParameters
+        fields = ('name', 'value',)
+
+
+class CatalogProductSerializer(ProductSerializer):
+    parameters = ProductParameterSerializer(source='productsparameters_set',
+                                            read_only=True,
+                                            many=True)
+    average_rating = serializers.FloatField(read_only=True)
+    count_rating = serializers.IntegerField(read_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        exclude = None
+        fields = ('id', 'name', 'image', 'description', 'parameters',
+                  'average_rating', 'count_rating')
+
+
+class CatalogSerializer(ProductInfoSerializer):
+    product = CatalogProductSerializer(read_only=True)
+    brand = BrandSerializer(read_only=True)
+    category = CategorySerializer(read_only=True)
+    shop = ShopSerializer(read_only=True)
+
+    class Meta(ProductInfoSerializer.Meta):
+        fields = ('id', 'model', 'price', 'price_rrc', 'quantity', 'product',
+                  'brand', 'category', 'shop')
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     shop = serializers.StringRelatedField()
     category = serializers.StringRelatedField()
@@ -67,6 +107,11 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'price_per_item', 'total_price']
 
 
+class CartItemAddSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
 class OrderItemAddSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
@@ -104,3 +149,11 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ('id', 'status', 'total_items_count',
                   'total_price', 'contact', 'ordered_items')
         read_only_fields = ('id',)
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'username', 'text', 'rating', 'posted')
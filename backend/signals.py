@@ -0,0 +1,137 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import ATTRIBUTE_VERSION, CATALOG_VERSION, LISTING_VERSION, \
+    TAXONOMY_VERSION, bump_version, product_version_name
+from .cart import CacheCart, cart_changed, is_cache_cart
+from .catalog import schedule_catalog_refresh
+from .models import Brand, Category, Order, OrderItem, Parameter, Product, \
+    ProductInfo, ProductsParameters, Shop, StockHold
+from .prices import invalidate_price_bounds
+from .reservations import release_holds
+from .search import update_search_vectors
+from .search_index import index_product_change
+from .suggest import index_suggestion_change
+
+
+@receiver(post_save, sender=ProductInfo)
+def product_info_post_save(sender, instance, created, **kwargs):
+    new_state = (instance.price, instance.category_id, instance.brand_id)
+    old_state = None if created else getattr(instance, '_price_state', False)
+    if old_state != new_state:
+        bump_version(CATALOG_VERSION)
+        invalidate_price_bounds()
+    instance._price_state = new_state
+    bump_version(LISTING_VERSION, product_version_name(instance.product_id))
+    schedule_catalog_refresh(product_ids=[instance.product_id])
+
+
+@receiver(post_delete, sender=ProductInfo)
+def product_info_post_delete(sender, instance, **kwargs):
+    invalidate_price_bounds()
+    bump_version(CATALOG_VERSION, LISTING_VERSION,
+                 product_version_name(instance.product_id))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    bump_version(LISTING_VERSION, product_version_name(instance.pk))
+    schedule_catalog_refresh(product_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def product_post_save(sender, instance, **kwargs):
+    update_search_vectors(product_ids=[instance.pk])
+    index_product_change(instance)
+    index_suggestion_change('products', instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_post_delete(sender, instance, **kwargs):
+    index_product_change(instance, deleted=True)
+    index_suggestion_change('products', instance, deleted=True)
+
+
+@receiver(post_save, sender='authorization.Comment')
+@receiver(post_delete, sender='authorization.Comment')
+def comment_changed(sender, instance, **kwargs):
+    if instance.product_id is not None:
+        bump_version(LISTING_VERSION,
+                     product_version_name(instance.product_id))
+        schedule_catalog_refresh(product_ids=[instance.product_id])
+
+
+@receiver(post_save, sender='authorization.User')
+def user_post_save(sender, instance, created, update_fields=None, **kwargs):
+    # Review authors are part of the cached product pages.
+    if created or (update_fields is not None and
+                   'username' not in update_fields):
+        return
+    product_ids = instance.comments.filter(
+        product__isnull=False).values_list('product_id', flat=True).distinct()
+    if product_ids:
+        bump_version(*map(product_version_name, product_ids))
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def taxonomy_changed(sender, instance, **kwargs):
+    bump_version(LISTING_VERSION, TAXONOMY_VERSION)
+    if kwargs.get('created') is False:
+        scope = 'brand_ids' if sender is Brand else 'category_ids'
+        schedule_catalog_refresh(**{scope: [instance.pk]})
+    index_suggestion_change('brands' if sender is Brand else 'categories',
+                            instance, deleted='created' not in kwargs)
+
+
+@receiver(post_save, sender=Shop)
+def shop_post_save(sender, instance, created, **kwargs):
+    bump_version(TAXONOMY_VERSION)
+    if not created:
+        schedule_catalog_refresh(shop_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Parameter)
+@receiver(post_delete, sender=Parameter)
+def parameter_changed(sender, instance, **kwargs):
+    bump_version(TAXONOMY_VERSION, ATTRIBUTE_VERSION, LISTING_VERSION)
+
+
+@receiver(post_save, sender=ProductsParameters)
+@receiver(post_delete, sender=ProductsParameters)
+def product_parameter_changed(sender, instance, **kwargs):
+    bump_version(ATTRIBUTE_VERSION, LISTING_VERSION,
+                 product_version_name(instance.product_id))
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    cart_changed(instance.user_id)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    # Totals are kept with UPDATE, which sends no Order signal.
+    try:
+        user_id = instance.order.user_id
+    except Order.DoesNotExist:
+        return
+    cart_changed(user_id)
+
+
+@receiver(pre_delete, sender=OrderItem)
+def order_item_pre_delete(sender, instance, **kwargs):
+    # Give the line's held stock back before the hold cascades away.
+    release_holds(StockHold.objects.filter(item=instance))
+
+
+@receiver(user_logged_in)
+def merge_cache_cart(sender, request, user, **kwargs):
+    if is_cache_cart() and request is not None:
+        CacheCart(request).merge_into(user)
@@ -0,0 +1,137 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from .cache import VersionedIndex
+from .models import Brand, Category, Product
+
+SUGGEST_INDEX_VERSION = 'suggest_index'
+
+SUGGEST_SOURCES = (
+    ('products', Product),
+    ('brands', Brand),
+    ('categories', Category),
+)
+SUGGEST_LIMIT = 8
+MAX_SUGGEST_LIMIT = 20
+MAX_PREFIX_LENGTH = 50
+
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize_prefix(text):
+    return ' '.join(WORD_RE.findall((text or '').lower()))
+
+
+def suggestion_keys(label):
+    # One key per word start, so "Galaxy S23 Ultra" is found by "gal",
+    # "s23" and "ult" alike.
+    words = normalize_prefix(label).split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+class SuggestionIndex:
+    CACHE_SIZE = 2048
+
+    def __init__(self, version=None):
+        self.version = version
+        self._keys = {kind: [] for kind, _ in SUGGEST_SOURCES}
+        self._labels = {kind: {} for kind, _ in SUGGEST_SOURCES}
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return sum(len(labels) for labels in self._labels.values())
+
+    def add(self, kind, object_id, label):
+        with self._lock:
+            self._remove(kind, object_id)
+            keys = self._keys[kind]
+            for key in suggestion_keys(label):
+                insort(keys, (key, object_id))
+            self._labels[kind][object_id] = label
+            self._cache.clear()
+
+    def remove(self, kind, object_id):
+        with self._lock:
+            self._remove(kind, object_id)
+            self._cache.clear()
+
+    def _remove(self, kind, object_id):
+        label = self._labels[kind].pop(object_id, None)
+        if label is None:
+            return
+        keys = self._keys[kind]
+        for key in suggestion_keys(label):
+            position = bisect_left(keys, (key, object_id))
+            if position < len(keys) and keys[position] == (key, object_id):
+                del keys[position]
+
+    def _lookup(self, kind, prefix, limit):
+        keys = self._keys[kind]
+        labels = self._labels[kind]
+        found = {}
+        position = bisect_left(keys, (prefix,))
+        while position < len(keys) and len(found) < limit:
+            key, object_id = keys[position]
+            if not key.startswith(prefix):
+                break
+            found.setdefault(object_id, labels[object_id])
+            position += 1
+        return [{'id': object_id, 'name': label}
+                for object_id, label in found.items()]
+
+    def suggest(self, prefix, limit=SUGGEST_LIMIT):
+        prefix = normalize_prefix(prefix[:MAX_PREFIX_LENGTH])
+        if not prefix:
+            return {kind: [] for kind, _ in SUGGEST_SOURCES}
+        with self._lock:
+            cache_key = (prefix, limit)
+            result = self._cache.get(cache_key)
+            if result is not None:
+                self._cache.move_to_end(cache_key)
+                return result
+            result = {kind: self._lookup(kind, prefix, limit)
+                      for kind, _ in SUGGEST_SOURCES}
+            self._cache[cache_key] = result
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return result
+
+    @classmethod
+    def from_database(cls):
+        # Keys are collected and sorted once per kind; insort is only for
+        # single changes, it would make a full build quadratic.
+        index = cls()
+        for kind, model in SUGGEST_SOURCES:
+            keys = []
+            labels = index._labels[kind]
+            for object_id, name in model.objects.values_list(
+                    'id', 'name').order_by().iterator():
+                labels[object_id] = name
+                keys.extend((key, object_id) for key in suggestion_keys(name))
+            keys.sort()
+            index._keys[kind] = keys
+        return index
+
+
+# Same life cycle as the search index: built on first use, rebuilt when
+# another process has bumped the shared version.
+_index = VersionedIndex(SUGGEST_INDEX_VERSION, SuggestionIndex.from_database)
+
+
+def get_suggestion_index():
+    return _index.get()
+
+
+def index_suggestion_change(kind, instance, deleted=False):
+    object_id, label = instance.pk, instance.name
+
+    def change(index):
+        if deleted:
+            index.remove(kind, object_id)
+        else:
+            index.add(kind, object_id, label)
+
+    _index.patch_on_commit(change)
@@ -1,3 +1,202 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, \
+    skipUnlessDBFeature
+from django.utils import timezone
+
+from authorization.factories import UserFactory
+from .cart import add_items_to_cart, place_order
+from .models import Brand, Category, Order, OrderItem, Product, ProductInfo, \
+    Shop, StockHold
+from .reservations import hold_stock, release_expired_holds
+
+
+class PlaceOrderFixtureMixin:
+    STOCK = 10
+    BUYERS = 30
+
+    def setUp(self):
+        brand = Brand.objects.create(name='Brand')
+        category = Category.objects.create(name='Category')
+        shop = Shop.objects.create(name='Shop')
+        self.products = [Product.objects.create(name=f'Product {i}')
+                         for i in range(2)]
+        for product in self.products:
+            ProductInfo.objects.create(model='model', brand=brand,
+                                       category=category, shop=shop,
+                                       product=product, quantity=self.STOCK,
+                                       price=100, price_rrc=100)
+        self.order_ids = []
+        for i in range(self.BUYERS):
+            user = UserFactory(email=f'buyer{i}@example.com',
+                               username=f'buyer{i}')
+            order = Order.objects.create(user=user, status='new',
+                                         is_active=True)
+            # Half of the buyers list the products in the opposite order,
+            # which deadlocks if the rows are not locked in a fixed order.
+            products = self.products if i % 2 else self.products[::-1]
+            for product in products:
+                OrderItem.objects.create(order=order, product=product,
+                                         brand=brand, category=category,
+                                         shop=shop, quantity=1)
+            self.order_ids.append(order.pk)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class PlaceOrderConcurrencyTest(PlaceOrderFixtureMixin, TransactionTestCase):
+    # Needs a database with real row locking (PostgreSQL); SQLite
+    # serializes writers and is skipped.
+    def test_concurrent_checkouts_never_oversell(self):
+        barrier = threading.Barrier(self.BUYERS)
+        results = []
+        errors = []
+
+        def checkout(order_id):
+            try:
+                barrier.wait()
+                results.append(place_order(order_id)[1])
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(order_id,))
+                   for order_id in self.order_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        placed = sum(1 for shortages in results if not shortages)
+        self.assertEqual(placed, self.STOCK)
+        self.assertEqual(
+            Order.objects.filter(status='ordered').count(), self.STOCK)
+        self.assertEqual(
+            sorted(ProductInfo.objects.values_list('quantity', flat=True)),
+            [0, 0])
+
+
+class PlaceOrderTest(PlaceOrderFixtureMixin, TestCase):
+    BUYERS = 1
+
+    def test_shortage_rolls_back_whole_order(self):
+        ProductInfo.objects.filter(product=self.products[1]).update(
+            quantity=0)
+        order, shortages = place_order(self.order_ids[0])
+
+        self.assertEqual(shortages, [self.products[1].name])
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'new')
+        self.assertEqual(ProductInfo.objects.get(
+            product=self.products[0]).quantity, self.STOCK)
+
+
+class OrderFixtureMixin:
+    STOCK = 10
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Brand')
+        self.category = Category.objects.create(name='Category')
+        self.shop = Shop.objects.create(name='Shop')
+        self.products = [Product.objects.create(name=f'Product {i}')
+                         for i in range(2)]
+        self.offers = [ProductInfo.objects.create(
+            model='model', brand=self.brand, category=self.category,
+            shop=self.shop, product=product, quantity=self.STOCK,
+            price=100 * (i + 1), price_rrc=100)
+            for i, product in enumerate(self.products)]
+        self.user = UserFactory(email='buyer@example.com', username='buyer')
+
+    def create_item(self, order, product, quantity):
+        return OrderItem.objects.create(order=order, product=product,
+                                        brand=self.brand,
+                                        category=self.category,
+                                        shop=self.shop, quantity=quantity)
+
+
+class OrderTotalsTest(OrderFixtureMixin, TestCase):
+    # The totals are shifted by deltas in the OrderItem signals; after any
+    # change they must equal a full recount of the lines.
+    def assertTotalsMatch(self, *orders):
+        ids = [order.pk for order in orders]
+        kept = dict(Order.objects.filter(pk__in=ids).values_list(
+            'pk', 'total_items_count'))
+        kept_prices = dict(Order.objects.filter(pk__in=ids).values_list(
+            'pk', 'total_price'))
+        Order.recompute_totals(ids)
+        self.assertEqual(kept, dict(Order.objects.filter(
+            pk__in=ids).values_list('pk', 'total_items_count')))
+        self.assertEqual(kept_prices, dict(Order.objects.filter(
+            pk__in=ids).values_list('pk', 'total_price')))
+
+    def test_totals_follow_item_changes(self):
+        order = Order.objects.create(user=self.user, status='new')
+        other = Order.objects.create(user=self.user, status='ordered')
+        first = self.create_item(order, self.products[0], 2)
+        second = self.create_item(order, self.products[1], 1)
+        self.assertTotalsMatch(order)
+        order.refresh_from_db()
+        self.assertEqual((order.total_items_count, order.total_price),
+                         (3, 400))
+
+        first.quantity = 5
+        first.save()
+        self.assertTotalsMatch(order)
+
+        first = OrderItem.objects.get(pk=first.pk)
+        first.order = other
+        first.save()
+        self.assertTotalsMatch(order, other)
+
+        second.delete()
+        self.assertTotalsMatch(order, other)
+        order.refresh_from_db()
+        self.assertEqual((order.total_items_count, order.total_price),
+                         (0, 0))
+
+
+class ReservedStockTest(OrderFixtureMixin, TestCase):
+    def reserved(self):
+        return list(ProductInfo.objects.order_by('pk').values_list(
+            'reserved', flat=True))
+
+    def test_holds_follow_cart_changes(self):
+        order, errors = add_items_to_cart(
+            self.user, [(self.products[0].pk, 3), (self.products[1].pk, 2)])
+        self.assertEqual(errors, [])
+        self.assertEqual(self.reserved(), [3, 2])
+
+        item = OrderItem.objects.get(order=order, product=self.products[0])
+        item.quantity = 1
+        self.assertEqual(hold_stock(order, [(item, self.offers[0])]), [])
+        item.save()
+        self.assertEqual(self.reserved(), [1, 2])
+
+        item.quantity = self.STOCK + 1
+        self.assertEqual(hold_stock(order, [(item, self.offers[0])]),
+                         [item])
+
+        OrderItem.objects.filter(order=order).delete()
+        self.assertEqual(self.reserved(), [0, 0])
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_expired_holds_are_released(self):
+        add_items_to_cart(self.user, [(self.products[0].pk, 4)])
+        self.assertEqual(release_expired_holds(), 0)
+        StockHold.objects.update(expires=timezone.now() - timedelta(
+            seconds=1))
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertEqual(self.reserved(), [0, 0])
+        self.assertEqual(ProductInfo.objects.get(
+            pk=self.offers[0].pk).quantity, self.STOCK)
+
+    def test_checkout_consumes_holds(self):
+        order, _ = add_items_to_cart(self.user, [(self.products[0].pk, 4)])
+        order, shortages = place_order(order.pk)
+        self.assertEqual(shortages, [])
+        self.assertEqual(self.reserved(), [0, 0])
+        self.assertEqual(ProductInfo.objects.get(
+            pk=self.offers[0].pk).quantity, self.STOCK - 4)
+        self.assertFalse(StockHold.objects.exists())
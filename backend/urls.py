@@ -1,25 +1,34 @@
 from django.urls import path
 from rest_framework import routers
 
-from .views import CartView, IndexView, ProductInfoView, add_to_cart,\
+from .views import CartItemsView, CartView, CatalogViewSet, IndexView, \
+    ProductInfoView, ReviewsView, ShopOrdersView, SuggestView, add_to_cart, \
     remove_from_cart, search
 
 app_name = 'backend'
 
 router = routers.SimpleRouter()
+router.register(r'api/catalog', CatalogViewSet, basename='catalog')
 
 urlpatterns = [
     path('', IndexView.as_view(),
          name='index'),
     path('product/<int:product_id>', ProductInfoView.as_view(),
          name='product_info'),
+    path('product/<int:product_id>/reviews', ReviewsView.as_view(),
+         name='product_reviews'),
     path('remove_from_cart/<int:item_id>', remove_from_cart,
          name='remove_from_cart'),
     path('add_to_cart/<int:product_id>', add_to_cart,
          name='add_to_cart'),
     path('cart', CartView.as_view(),
          name='cart'),
+    path('api/cart/items', CartItemsView.as_view(),
+         name='cart_items'),
+    path('shop/orders', ShopOrdersView.as_view(),
+         name='shop_orders'),
     path('search/', search, name='search'),
+    path('search/suggest/', SuggestView.as_view(), name='search_suggest'),
 ]
 
 urlpatterns += router.urls
@@ -1,105 +1,224 @@
+from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-from django.db.models import Q, Sum, Max, Min
-from django.shortcuts import get_object_or_404, redirect, render
-
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect, render
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from rest_framework import status
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 from rest_framework.response import Response
-
-from .models import Brand, Category, Order, OrderItem, Product, ProductInfo
+from rest_framework.settings import api_settings
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from .attributes import get_attribute_index, parse_attribute_filters
+from .authentication import AnonymousCsrfAuthentication
+from .cache import FRAGMENT_CACHE_TIMEOUT, LISTING_VERSION, \
+    PAGE_CACHE_TIMEOUT, TAXONOMY_VERSION, get_version, get_versions, \
+    page_cache_key, product_version_name
+from .cart import CacheCart, add_items_to_cart, cart_count, \
+    is_cache_cart, place_order
+from .conditional import catalog_etag, catalog_last_modified, \
+    product_etag, product_last_modified
+from .facets import facet_counts, normalize_ids
+from .fulfilment import SHOP_STATUSES, STATUS_TRANSITIONS, \
+    attach_shop_lines, shop_order_rows, transition_orders
+from .idempotency import idempotent
+from .models import RATING_FIELDS, STATUS_CHOICES, Brand, CatalogEntry, \
+    Category, Order, OrderItem, Product, ProductInfo, Shop
+from .pagination import CatalogPagination, CountedPaginator, keyset_page, \
+    normalize_page_size, normalize_sort
+from .prices import filtered_price_bounds, price_bounds, price_histogram
+from .product_detail import load_product_detail, review_page
+from .reservations import hold_stock
+from .renderers import UJSONRenderer
+from .search import search_products
+from .serializers import CartItemAddSerializer, CatalogSerializer, \
+    ReviewSerializer
+from .suggest import MAX_SUGGEST_LIMIT, SUGGEST_LIMIT, get_suggestion_index
 from authorization.models import Comment
-from shop.task import send_email_order_placed
+from shop.task import send_email_order_placed, send_email_order_status
+
+CATALOG_SORT_FIELDS = {
+    'id': 'pk',
+    'price': 'price',
+    'product__name': 'product_name',
+}
+# Views that take cart writes from anonymous visitors when carts live in
+# the cache.
+CART_AUTHENTICATION_CLASSES = (*api_settings.DEFAULT_AUTHENTICATION_CLASSES,
+                               AnonymousCsrfAuthentication)
 
 
 class IndexView(APIView):
     template_name = 'store.html'
 
+    @method_decorator(condition(etag_func=catalog_etag,
+                                last_modified_func=catalog_last_modified))
     def get(self, request, *args, **kwargs):
 
-        price_min_abs = ProductInfo.objects.aggregate(Min('price'))[
-            'price__min']
-        price_max_abs = ProductInfo.objects.aggregate(Max('price'))[
-            'price__max']
-
         category_vars = set(request.GET.getlist('category'))
         brand_vars = set(request.GET.getlist('brand'))
+        attribute_vars = set(request.GET.getlist('param'))
+        attributes = parse_attribute_filters(attribute_vars)
+        bounds = price_bounds()
+        price_min_abs, price_max_abs = filtered_price_bounds(
+            bounds, normalize_ids(category_vars), normalize_ids(brand_vars))
         price_min = int(request.GET.get('min_price', price_min_abs))
         price_max = int(request.GET.get('max_price', price_max_abs))
-        paginate_by = int(request.GET.get('paginate_by', 20))
-        sort_by = str(request.GET.get('sort_by', 'id'))
-        page = int(request.GET.get('page', 1))
-
-        categories = Category.objects.all()
-        brands = Brand.objects.all()
-        products = ProductInfo.objects.all()
-
+        paginate_by = normalize_page_size(request.GET.get('paginate_by', 20))
+        sort_by = normalize_sort(str(request.GET.get('sort_by', 'id')))
+        page = request.GET.get('page', 1)
+        pagination = 'cursor' if request.GET.get('pagination') == 'cursor' \
+            else 'page'
+        cursor = request.GET.get('cursor')
+
+        page_key = None
+        # Anonymous pages are shared, so only the empty cart badge is cached.
+        if not request.user.is_authenticated and \
+                request.accepted_renderer.format == 'html' and \
+                not len(messages.get_messages(request)) and \
+                not cart_count(request):
+            params = (normalize_ids(category_vars), normalize_ids(brand_vars),
+                      attributes, price_min, price_max, paginate_by, sort_by,
+                      pagination,
+                      cursor if pagination == 'cursor' else str(page))
+            page_key = page_cache_key('index', params,
+                                      get_version(LISTING_VERSION))
+            content = cache.get(page_key)
+            if content is not None:
+                return HttpResponse(content)
+
+        facets = facet_counts(category_vars, brand_vars, price_min,
+                              price_max, price_min_abs, price_max_abs,
+                              attributes)
+        categories = list(Category.objects.all())
+        for category in categories:
+            category.facet_count = facets['categories'].get(category.id, 0)
+        brands = list(Brand.objects.all())
+        for brand in brands:
+            brand.facet_count = facets['brands'].get(brand.id, 0)
+        products = CatalogEntry.objects.filter(
+            price__range=(price_min, price_max))
         if category_vars:
-            products = products.filter(category__in=category_vars)
+            products = products.filter(
+                category_id__in=normalize_ids(category_vars))
         if brand_vars:
-            products = products.filter(brand__in=brand_vars)
-
-        products = products.filter(price__range=(price_min, price_max))
-
-        try:
-            cart_count = Order.objects.filter(status='new').values_list(
-                'total_items_count', flat=True).get(user=self.request.user)
-        except (Order.DoesNotExist, TypeError):
-            cart_count = None
-
-        sorted_products = products.order_by(sort_by)
-        paginator = Paginator(sorted_products, paginate_by)
+            products = products.filter(
+                brand_id__in=normalize_ids(brand_vars))
+        product_ids = get_attribute_index().product_ids(attributes)
+        if product_ids is not None:
+            products = products.filter(product_id__in=product_ids)
+        order_by = CATALOG_SORT_FIELDS.get(sort_by.lstrip('-'), 'pk')
+        if sort_by.startswith('-'):
+            order_by = f'-{order_by}'
+
+        page_range = None
+        if pagination == 'cursor':
+            products_info = keyset_page(products, order_by, paginate_by,
+                                        cursor)
+        else:
+            sorted_products = products.order_by(order_by, 'pk')
+            paginator = CountedPaginator(sorted_products, paginate_by,
+                                         count=facets['total'])
 
-        try:
-            products_info = paginator.get_page(page)
-        except PageNotAnInteger:
-            products_info = paginator.get_page(1)
-        except EmptyPage:
-            products_info = paginator.page(paginator.num_pages)
+            try:
+                products_info = paginator.get_page(page)
+            except PageNotAnInteger:
+                products_info = paginator.get_page(1)
+            except EmptyPage:
+                products_info = paginator.page(paginator.num_pages)
+            page_range = paginator.get_elided_page_range(
+                products_info.number, on_each_side=2, on_ends=1)
+            products_info.object_list = list(products_info.object_list)
+
+        versions = get_versions(
+            [TAXONOMY_VERSION] +
+            [product_version_name(pi.product_id) for pi in products_info])
+        for pi in products_info:
+            pi.card_version = '{}.{}'.format(
+                versions[TAXONOMY_VERSION],
+                versions[product_version_name(pi.product_id)])
 
         data = {
-            'products': products,
+            'total': facets['total'],
             'products_info': products_info,
+            'pagination': pagination,
+            'page_range': page_range,
             'categories': categories,
             'brands': brands,
+            'attributes': facets['attributes'],
+            'price_buckets': facets['price_buckets'],
+            'price_histogram': price_histogram(bounds),
             'paginate_by': paginate_by,
             'sort_by': sort_by,
-            'cart_count': cart_count,
             'price_min': price_min,
             'price_max': price_max,
             'price_min_abs': price_min_abs,
             'price_max_abs': price_max_abs,
             'category_vars': category_vars,
-            'brand_vars': brand_vars
+            'brand_vars': brand_vars,
+            'attribute_vars': attribute_vars,
+            'fragment_timeout': FRAGMENT_CACHE_TIMEOUT
         }
-        return Response(data)
+        response = Response(data)
+        if page_key is not None:
+            response.add_post_render_callback(
+                lambda r: cache.set(page_key, r.content, PAGE_CACHE_TIMEOUT))
+        return response
+
+
+class CatalogViewSet(ReadOnlyModelViewSet):
+    serializer_class = CatalogSerializer
+    pagination_class = CatalogPagination
+    renderer_classes = (UJSONRenderer, BrowsableAPIRenderer)
+    permission_classes = (AllowAny,)
+
+    def get_queryset(self):
+        queryset = ProductInfo.objects.select_related(
+            'product__rating', 'brand', 'category', 'shop').prefetch_related(
+            'product__productsparameters_set__parameter')
+        params = self.request.query_params
+
+        categories = normalize_ids(params.getlist('category'))
+        brands = normalize_ids(params.getlist('brand'))
+        if categories:
+            queryset = queryset.filter(category__in=categories)
+        if brands:
+            queryset = queryset.filter(brand__in=brands)
+        product_ids = get_attribute_index().product_ids(
+            parse_attribute_filters(params.getlist('param')))
+        if product_ids is not None:
+            queryset = queryset.filter(product_id__in=product_ids)
+        if params.get('min_price', '').isdigit():
+            queryset = queryset.filter(price__gte=int(params['min_price']))
+        if params.get('max_price', '').isdigit():
+            queryset = queryset.filter(price__lte=int(params['max_price']))
+
+        sort_by = normalize_sort(params.get('sort_by', 'id'))
+        return queryset.order_by(sort_by, 'id')
 
 
 class ProductInfoView(APIView):
     template_name = 'product.html'
+    authentication_classes = CART_AUTHENTICATION_CLASSES
 
+    @method_decorator(condition(etag_func=product_etag,
+                                last_modified_func=product_last_modified))
     def get(self, request, product_id, *args, **kwargs):
-        product_info = get_object_or_404(ProductInfo,
-                                         product_id=product_id)
-        parameters = Product.parameters.through.objects.filter(
-            product_id=product_id)
-        comments = Comment.objects.filter(product_id=product_id).order_by(
-            '-posted')
-
-        try:
-            cart_count = Order.objects.filter(status='new').values_list(
-                'total_items_count', flat=True).get(user=self.request.user)
-        except (Order.DoesNotExist, TypeError):
-            cart_count = None
+        bundle = load_product_detail(product_id)
+        if bundle is None:
+            raise Http404
 
-        data = {
-            'product_info': product_info,
-            'parameters': parameters,
-            'comments': comments,
-            'cart_count': cart_count
-        }
-        return Response(data)
+        return Response(bundle)
 
 
 
@@ -107,14 +226,18 @@ class ProductInfoView(APIView):
         if request.POST.get('form_name') == 'add_review':
             product_id = int(request.data['product'])
             text = str(request.POST.get('text'))
-            rating = int(request.POST.get('rating'))
+            try:
+                rating = int(request.POST.get('rating'))
+            except (TypeError, ValueError):
+                rating = None
 
             if not text:
                 messages.error(request, 'Need text to add review')
                 return redirect("backend:product_info",
                                 product_id=product_id)
-            if not rating:
-                messages.error(request, 'Need rating to add review')
+            if rating not in RATING_FIELDS:
+                messages.error(request,
+                               'Need rating from 1 to 5 to add review')
                 return redirect("backend:product_info",
                                 product_id=product_id)
 
@@ -137,28 +260,47 @@ class ProductInfoView(APIView):
                             product_id=product_id)
 
 
+class ReviewsView(APIView):
+    renderer_classes = (UJSONRenderer,)
+    permission_classes = (AllowAny,)
+
+    def get(self, request, product_id, *args, **kwargs):
+        page = review_page(product_id, request.GET.get('cursor'))
+        return Response({
+            'results': ReviewSerializer(page, many=True).data,
+            'next_cursor': page.next_cursor,
+        })
+
+
 class CartView(LoginRequiredMixin, APIView):
     template_name = 'cart.html'
+    authentication_classes = CART_AUTHENTICATION_CLASSES
+
+    def dispatch(self, request, *args, **kwargs):
+        # Cache carts are open to anonymous visitors as well.
+        if is_cache_cart():
+            return APIView.dispatch(self, request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
 
     def get(self, request, *args, **kwargs):
+        if is_cache_cart():
+            order, products = CacheCart(request).order()
+            if not products:
+                messages.error(request, 'You do not have an active order!')
+                return Response()
+            return Response({
+                'order': order,
+                'products': products
+            })
+
         try:
             order = Order.objects.filter(status='new', is_active=True).get(
                 user=self.request.user)
             products = OrderItem.objects.filter(order=order).order_by('id')
-            total_price = OrderItem.objects.filter(order=order).aggregate(
-                Sum('total_price'))
-
-            try:
-                cart_count = Order.objects.filter(status='new').values_list(
-                    'total_items_count', flat=True).get(user=self.request.user)
-            except (Order.DoesNotExist, TypeError):
-                cart_count = None
 
             data = {
                 'order': order,
-                'products': products,
-                'total_price': total_price,
-                'cart_count': cart_count
+                'products': products
             }
             return Response(data)
 
@@ -166,11 +308,18 @@ class CartView(LoginRequiredMixin, APIView):
             messages.error(request, 'You do not have an active order!')
             return Response()
 
+    @method_decorator(idempotent('cart'))
     def post(self, request, *args, **kwargs):
         if request.POST.get('form_name') == 'change_quantity':
             product_id = int(request.POST.get('product_id'))
             quantity = int(request.POST.get('quantity'))
 
+            if is_cache_cart():
+                error = CacheCart(request).set_quantity(product_id, quantity)
+                if error:
+                    messages.error(request, error)
+                return redirect('backend:cart')
+
             try:
                 order = Order.objects.filter(status='new',
                                              is_active=True).get(
@@ -180,97 +329,189 @@ class CartView(LoginRequiredMixin, APIView):
                                         'again!')
                 return redirect('backend:cart')
 
-            try:
-                order_item = OrderItem.objects.filter(order=order).get(
-                    product=product_id)
-            except OrderItem.DoesNotExist:
-                messages.error(request, 'Product does not found in your cart! '
-                                        'Please try again!')
-                return redirect('backend:cart')
+            with transaction.atomic():
+                # Locked, so that the totals delta of the save is taken
+                # against the current quantity, not one a concurrent edit
+                # has already replaced.
+                try:
+                    order_item = OrderItem.objects.select_for_update().filter(
+                        order=order).get(product=product_id)
+                except OrderItem.DoesNotExist:
+                    messages.error(request, 'Product does not found in your '
+                                            'cart! Please try again!')
+                    return redirect('backend:cart')
+
+                try:
+                    product = ProductInfo.objects.get(product=product_id,
+                                                      shop=order_item.shop_id)
+                except ProductInfo.DoesNotExist:
+                    messages.error(request, 'Product does not found! '
+                                            'Please try again!')
+                    return redirect('backend:cart')
 
-            try:
-                product = ProductInfo.objects.get(product=product_id)
-            except Product.DoesNotExist:
-                messages.error(request, 'Product does not found! '
-                                        'Please try again!')
-                return redirect('backend:cart')
-
-            if quantity <= product.quantity:
                 order_item.quantity = quantity
+                if hold_stock(order, [(order_item, product)]):
+                    transaction.set_rollback(True)
+                    messages.error(request, 'SORRY, OUT OF STOCK OR TO MANY!')
+                    return redirect('backend:cart')
                 order_item.save()
-                return redirect('backend:cart')
-            else:
-                messages.error(request, 'SORRY, OUT OF STOCK OR TO MANY!')
-                return redirect('backend:cart')
+            return redirect('backend:cart')
         elif request.POST.get('form_name') == 'place_order':
-            try:
-                order = Order.objects.filter(status='new',
-                                             is_active=True).get(
-                    user=self.request.user)
-                order_items = OrderItem.objects.filter(order=order)
-
-                for order_item in order_items:
-                    product = ProductInfo.objects.get(product=order_item.product)
-                    if order_item.quantity > product.quantity:
-                        messages.error(request,
-                                       f'SORRY, "{order_item.product.name}" '
-                                       f'OUT OF STOCK OR TO MANY!')
-                        return redirect('backend:cart')
-                    else:
-                        product.quantity -= order_item.quantity
-                        product.save()
-                order.status = 'ordered'
-                order.save()
-                send_email_order_placed.delay(self.request.user.id, order.id)
-                messages.success(request, 'Order was placed successfully!')
-                return redirect('backend:cart')
-            except Order.DoesNotExist:
+            if not request.user.is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            if is_cache_cart():
+                order, shortages = CacheCart(request).checkout()
+            else:
+                try:
+                    order = Order.objects.filter(status='new',
+                                                 is_active=True).get(
+                        user=self.request.user)
+                except Order.DoesNotExist:
+                    messages.error(request, 'Order does not found! Please '
+                                            'try again!')
+                    return redirect('backend:cart')
+                order, shortages = place_order(order.pk)
+            if order is None:
                 messages.error(request, 'Order does not found! Please try '
                                         'again!')
-                return redirect('backend:cart')
+            elif shortages:
+                for name in shortages:
+                    messages.error(request, f'SORRY, "{name}" '
+                                            f'OUT OF STOCK OR TO MANY!')
+            else:
+                send_email_order_placed.delay(self.request.user.id, order.id)
+                messages.success(request, 'Order was placed successfully!')
+            return redirect('backend:cart')
 
 
-@login_required
+@idempotent('add_to_cart')
 def add_to_cart(request, product_id, quantity=1):
-    product = get_object_or_404(Product,
-                                pk=product_id)
-    product_info = get_object_or_404(ProductInfo,
-                                     product=product)
-
-    if quantity <= int(product_info.quantity):
-        order, created = Order.objects.get_or_create(status='new',
-                                                     is_active=True,
-                                                     user=request.user,
-                                                     contact=request.user.contacts.
-                                                     first())
-        order_item, created = OrderItem.objects.get_or_create(
-            brand=product_info.brand,
-            category=product_info.category,
-            product=product,
-            order=order,
-            shop=product_info.shop)
-        order_item.quantity += quantity
-        order_item.save()
-        messages.success(request, 'Product added to cart successfully!')
-        return redirect(request.META.get('HTTP_REFERER',
-                                         'redirect_if_referer_not_found'))
+    if is_cache_cart():
+        errors = CacheCart(request).add_items([(product_id, quantity)])
+    elif not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
     else:
-        messages.error(request, 'SORRY, OUT OF STOCK OR TO MANY!')
+        order, errors = add_items_to_cart(request.user,
+                                          [(product_id, quantity)])
+    if errors:
+        for error in errors:
+            messages.error(request, error)
+    else:
+        messages.success(request, 'Product added to cart successfully!')
+    return redirect(request.META.get('HTTP_REFERER',
+                                     'redirect_if_referer_not_found'))
+
+
+class CartItemsView(APIView):
+    renderer_classes = (UJSONRenderer,)
+    authentication_classes = CART_AUTHENTICATION_CLASSES
+    permission_classes = (IsAuthenticated,)
+
+    def get_permissions(self):
+        if is_cache_cart():
+            return [AllowAny()]
+        return super().get_permissions()
+
+    @method_decorator(idempotent('cart_items'))
+    def post(self, request, *args, **kwargs):
+        items = request.data.get('items') \
+            if isinstance(request.data, dict) else request.data
+        serializer = CartItemAddSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = [(item['product'], item['quantity'])
+                 for item in serializer.validated_data]
+        if is_cache_cart():
+            cart = CacheCart(request)
+            errors = cart.add_items(items)
+            if errors:
+                return Response({'errors': errors},
+                                status=status.HTTP_400_BAD_REQUEST)
+            order, _ = cart.order()
+            return Response({'order': None,
+                             'total_items_count': order.total_items_count,
+                             'total_price': str(order.total_price)})
+        order, errors = add_items_to_cart(request.user, items)
+        if errors:
+            return Response({'errors': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({'order': order.pk,
+                         'total_items_count': order.total_items_count,
+                         'total_price': str(order.total_price)})
+
+
+class ShopOrdersView(LoginRequiredMixin, APIView):
+    template_name = 'shop_orders.html'
+    ORDERS_PER_PAGE = 20
+
+    def get_shop(self):
+        if self.request.user.type != 'shop':
+            return None
+        return Shop.objects.filter(user=self.request.user).first()
+
+    def get(self, request, *args, **kwargs):
+        shop = self.get_shop()
+        if shop is None:
+            messages.error(request, 'You do not have a shop!')
+            return redirect('authorization:profile')
+
+        status_filter = request.GET.get('status')
+        if status_filter not in STATUS_TRANSITIONS:
+            status_filter = None
+        paginator = Paginator(shop_order_rows(shop, status_filter),
+                              self.ORDERS_PER_PAGE)
+        orders = paginator.get_page(request.GET.get('page', 1))
+        orders.object_list = attach_shop_lines(shop, orders.object_list)
+
+        data = {
+            'shop': shop,
+            'orders': orders,
+            'status_filter': status_filter,
+            'statuses': STATUS_CHOICES,
+            'shop_statuses': SHOP_STATUSES
+        }
+        return Response(data)
+
+    def post(self, request, *args, **kwargs):
+        shop = self.get_shop()
+        if shop is None:
+            messages.error(request, 'You do not have a shop!')
+            return redirect('authorization:profile')
+
+        status = request.POST.get('status')
+        order_ids = normalize_ids(request.POST.getlist('order'))
+        if status not in SHOP_STATUSES or not order_ids:
+            messages.error(request, 'Choose orders and a new status!')
+            return redirect('backend:shop_orders')
+
+        changed = transition_orders(shop, order_ids, status)
+        if changed:
+            send_email_order_status.delay(changed)
+            messages.success(request, f'Status "{status}" was set for '
+                                      f'{len(changed)} order(s)!')
+        skipped = len(order_ids) - len(changed)
+        if skipped:
+            messages.error(request, f'{skipped} order(s) can not be moved to '
+                                    f'"{status}"!')
         return redirect(request.META.get('HTTP_REFERER',
-                                         'redirect_if_referer_not_found'))
+                                         'backend:shop_orders'))
 
 
-@login_required
 def remove_from_cart(request, item_id):
+    # Cache carts have no order items; item_id is then the product id.
+    if is_cache_cart():
+        if not CacheCart(request).remove(item_id):
+            messages.error(request, 'Something WRONG!')
+        return redirect('backend:cart')
+    if not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
     try:
         order = Order.objects.filter(status='new',
                                      is_active=True).get(user=request.user)
         try:
-            order_item = OrderItem.objects.filter(order=order).get(id=item_id)
-            product = ProductInfo.objects.get(product=order_item.product)
-            product.quantity += order_item.quantity
-            order_item.delete()
-            product.save()
+            with transaction.atomic():
+                order_item = OrderItem.objects.select_for_update().filter(
+                    order=order).get(id=item_id)
+                order_item.delete()
             return redirect('backend:cart')
         except OrderItem.DoesNotExist:
             messages.error(request, 'Something WRONG!')
@@ -279,12 +520,26 @@ def remove_from_cart(request, item_id):
         messages.error(request, 'Something WRONG!')
         return redirect('backend:cart')
 
+class SuggestView(APIView):
+    renderer_classes = (UJSONRenderer,)
+    permission_classes = (AllowAny,)
+    throttle_classes = (ScopedRateThrottle,)
+    throttle_scope = 'suggest'
+
+    def get(self, request, *args, **kwargs):
+        limit = normalize_page_size(request.GET.get('limit'),
+                                    default=SUGGEST_LIMIT)
+        return Response(get_suggestion_index().suggest(
+            request.GET.get('q', ''), min(limit, MAX_SUGGEST_LIMIT)))
+
+
 def search(request):
     if request.method == 'GET':
         search_query = request.GET.get('search')
         if search_query:
-            results = Product.objects.filter(Q(name__icontains=search_query) | Q(
-                description__icontains=search_query))
+            paginator = Paginator(search_products(search_query),
+                                  settings.SEARCH_PAGE_SIZE)
+            results = paginator.get_page(request.GET.get('page', 1))
             data = {
                 'results': results,
                 'search_query': search_query
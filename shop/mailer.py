@@ -0,0 +1,202 @@
+import os
+import smtplib
+import threading
+import time
+from queue import Empty, LifoQueue, Queue
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+# Errors after which the connection itself is gone and the message may be
+# sent again over a new one.
+DISCONNECTS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+class EmailConnectionPool:
+    # SMTP connections kept open between the tasks of one worker process.
+    # Every sender (thread or greenlet) takes a connection of its own, at
+    # most size at a time; a connection that sat idle for longer than
+    # idle_timeout is checked with NOOP before it is used again.
+    def __init__(self, size, idle_timeout, **connection_kwargs):
+        self.pid = os.getpid()
+        self.idle_timeout = idle_timeout
+        self.connection_kwargs = connection_kwargs
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        connection = get_connection(**self.connection_kwargs)
+        connection.open()
+        return connection
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    @staticmethod
+    def _alive(connection):
+        smtp = getattr(connection, 'connection', False)
+        if smtp is False:
+            # Not an SMTP backend, nothing to go stale.
+            return True
+        if smtp is None:
+            return False
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            try:
+                connection, last_used = self._idle.get_nowait()
+            except Empty:
+                return self._connect()
+            if time.monotonic() - last_used > self.idle_timeout and \
+                    not self._alive(connection):
+                self._discard(connection)
+                return self._connect()
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, connection, broken=False):
+        if broken:
+            self._discard(connection)
+        else:
+            self._idle.put((connection, time.monotonic()))
+        self._slots.release()
+
+    def send_batch(self, groups):
+        # groups: lists of messages, one per sender, all sent over one
+        # connection. Returns the number sent or the error per group. When
+        # the connection drops (a reused one may have been closed by the
+        # server in the meantime) it is replaced once per batch and sending
+        # resumes at the message that failed, so nothing is sent twice.
+        results = []
+        connection = self._acquire()
+        broken = retried = False
+        try:
+            for messages in groups:
+                sent = 0
+                try:
+                    for message in messages:
+                        try:
+                            sent += connection.send_messages([message]) or 0
+                        except DISCONNECTS:
+                            if retried:
+                                raise
+                            retried = broken = True
+                            self._discard(connection)
+                            connection = self._connect()
+                            sent += connection.send_messages([message]) or 0
+                        broken = False
+                except Exception as error:
+                    broken = broken or isinstance(error, DISCONNECTS)
+                    results.append(error)
+                else:
+                    results.append(sent)
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            self._release(connection, broken)
+        return results
+
+    def send_messages(self, messages):
+        if not messages:
+            return 0
+        result = self.send_batch([messages])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self):
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except Empty:
+                return
+            self._discard(connection)
+
+
+class _Outgoing:
+    def __init__(self, messages):
+        self.messages = messages
+        self.done = threading.Event()
+        self.result = None
+
+
+class EmailOutbox:
+    # Queue in front of the pool. Senders wait for their own messages, while
+    # one drainer per pooled connection takes whatever has queued up in the
+    # meantime, up to about batch_size messages, and sends it as one batch.
+    # A lone message goes out at once; concurrent tasks share connections
+    # and batches.
+    def __init__(self, pool, drainers, batch_size):
+        self.pid = os.getpid()
+        self.pool = pool
+        self.batch_size = batch_size
+        self._queue = Queue()
+        for _ in range(drainers):
+            threading.Thread(target=self._drain, daemon=True).start()
+
+    def send(self, messages):
+        if not messages:
+            return 0
+        outgoing = _Outgoing(messages)
+        self._queue.put(outgoing)
+        outgoing.done.wait()
+        if isinstance(outgoing.result, Exception):
+            raise outgoing.result
+        return outgoing.result
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        size = len(batch[0].messages)
+        while size < self.batch_size:
+            try:
+                outgoing = self._queue.get_nowait()
+            except Empty:
+                break
+            batch.append(outgoing)
+            size += len(outgoing.messages)
+        return batch
+
+    def _drain(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self.pool.send_batch(
+                    [outgoing.messages for outgoing in batch])
+            except Exception as error:
+                results = [error] * len(batch)
+            for outgoing, result in zip(batch, results):
+                outgoing.result = result
+                outgoing.done.set()
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_email_outbox():
+    # One outbox and pool per process: a forked worker child must not share
+    # the sockets or threads of its parent.
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None or _outbox.pid != os.getpid():
+            pool = EmailConnectionPool(settings.EMAIL_POOL_SIZE,
+                                       settings.EMAIL_POOL_IDLE_TIMEOUT)
+            _outbox = EmailOutbox(pool, settings.EMAIL_POOL_SIZE,
+                                  settings.EMAIL_BATCH_SIZE)
+    return _outbox
+
+
+def deliver(messages):
+    return get_email_outbox().send(list(messages))
@@ -9,6 +9,7 @@ from django.utils.http import urlsafe_base64_encode
 from authorization.models import ConfirmEmailToken, User
 from backend.models import Order, OrderItem
 from authorization.tokens import account_activation_token
+from .mailer import deliver
 
 
 def reset_password_signal(email, **kwargs):
@@ -31,7 +32,7 @@ def reset_password_signal(email, **kwargs):
         [user.email]
     )
     msg.attach_alternative(msg_body, "text/html")
-    msg.send()
+    deliver([msg])
 
 
 def confirm_email_registered_signal(user_id, **kwargs):
@@ -47,7 +48,7 @@ def confirm_email_registered_signal(user_id, **kwargs):
         # to:
         [token.user.email]
     )
-    msg.send()
+    deliver([msg])
 
 
 def new_order_signal(user_id, order_id, **kwargs):
@@ -72,4 +73,35 @@ def new_order_signal(user_id, order_id, **kwargs):
         [user.email]
     )
     msg.attach_alternative(html_body, "text/html")
-    msg.send()
+    deliver([msg])
+
+
+def order_status_signal(order_ids, **kwargs):
+    # One message per order, all sent over a single connection.
+    orders = Order.objects.filter(id__in=order_ids).select_related('user')
+    order_items = {}
+    for item in OrderItem.objects.filter(
+            order_id__in=order_ids).select_related('product'):
+        order_items.setdefault(item.order_id, []).append(item)
+
+    messages = []
+    for order in orders:
+        context = {
+            'order': order,
+            'order_items': order_items.get(order.id, [])
+        }
+        html_body = render_to_string('email/order_status.html',
+                                     context=context)
+        msg = EmailMultiAlternatives(
+            # title:
+            'Order status update',
+            # message:
+            f'Order {order.id}: {order.get_status_display()}',
+            # from:
+            settings.EMAIL_HOST_USER,
+            # to:
+            [order.user.email]
+        )
+        msg.attach_alternative(html_body, "text/html")
+        messages.append(msg)
+    return deliver(messages)
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'rest_framework.authtoken',
@@ -84,6 +85,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'backend.context_processors.cart',
             ],
         },
     },
@@ -134,6 +136,11 @@ USE_TZ = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'database')
+SEARCH_CONFIG = 'english'
+SEARCH_PAGE_SIZE = 20
+SEARCH_INDEX_SNAPSHOT = os.path.join(STORAGE, 'search_index.json.gz')
+
 RECAPTCHA_PUBLIC_KEY = config.RECAPTCHA_PUBLIC_KEY
 RECAPTCHA_PRIVATE_KEY = config.RECAPTCHA_PRIVATE_KEY
 SILENCED_SYSTEM_CHECKS = ['captcha.recaptcha_test_key_error']
@@ -146,15 +153,38 @@ EMAIL_USE_SSL = True
 EMAIL_HOST_USER = config.EMAIL_HOST_USER
 EMAIL_HOST_PASSWORD = config.EMAIL_HOST_PASSWORD
 SERVER_EMAIL = EMAIL_HOST_USER
+# Open SMTP connections kept by each worker process (see shop.mailer).
+EMAIL_POOL_SIZE = 4
+EMAIL_POOL_IDLE_TIMEOUT = 60
+EMAIL_BATCH_SIZE = 100
 
 PASSWORD_RESET_TIMEOUT = 14400
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache'
+        if config.CACHE_URL else
+        'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': config.CACHE_URL or 'shop',
+    }
+}
+
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
 CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 3600}
 CELERY_RESULT_BACKEND = 'redis://127.0.0.1:6379/0'
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'release-expired-stock-holds': {
+        'task': 'shop.task.release_expired_stock_holds',
+        'schedule': 60,
+    },
+}
+
+CART_HOLD_TTL = 60 * 15
+
+CART_BACKEND = os.environ.get('CART_BACKEND', 'database')
 
 AUTH_USER_MODEL = 'authorization.User'
 
@@ -188,7 +218,8 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '5/second',
-        'user': '30/second'
+        'user': '30/second',
+        'suggest': '20/second'
     }
 }
 
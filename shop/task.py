@@ -1,6 +1,8 @@
 from shop.celery import app
+from backend.catalog import refresh_catalog_entries
+from backend.reservations import release_expired_holds
 from .service import confirm_email_registered_signal, new_order_signal, \
-    reset_password_signal
+    order_status_signal, reset_password_signal
 
 
 @app.task(ignore_result=False)
@@ -15,7 +17,28 @@ def send_email_order_placed(user_id, order_id):
     return 'Success'
 
 
+@app.task(ignore_result=False)
+def send_email_order_status(order_ids):
+    # One task for a whole bulk status change.
+    order_status_signal(order_ids)
+    return 'Success'
+
+
 @app.task(ignore_result=False)
 def send_email_to_reset_password(email):
     reset_password_signal(email)
     return 'Success'
+
+
+@app.task(ignore_result=True)
+def update_catalog_entries(product_ids=(), brand_ids=(), category_ids=(),
+                           shop_ids=()):
+    return refresh_catalog_entries(product_ids=product_ids,
+                                   brand_ids=brand_ids,
+                                   category_ids=category_ids,
+                                   shop_ids=shop_ids)
+
+
+@app.task(ignore_result=True)
+def release_expired_stock_holds():
+    return release_expired_holds()
@@ -0,0 +1,30 @@
+(function () {
+    // One key per page load: a double click or a resubmitted form sends the
+    // same key again and the server replays the first result.
+    function newKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + '-' +
+            Math.random().toString(36).slice(2) +
+            Math.random().toString(36).slice(2);
+    }
+
+    document.querySelectorAll('form[data-idempotent]').forEach(function (form) {
+        const input = document.createElement('input');
+        input.type = 'hidden';
+        input.name = 'idempotency_key';
+        input.value = newKey();
+        form.appendChild(input);
+    });
+
+    document.querySelectorAll('[data-idempotent-href]').forEach(function (element) {
+        const key = newKey();
+        element.addEventListener('click', function (event) {
+            event.preventDefault();
+            const href = element.dataset.idempotentHref;
+            location.href = href + (href.indexOf('?') === -1 ? '?' : '&') +
+                'idempotency_key=' + encodeURIComponent(key);
+        });
+    });
+})();
@@ -0,0 +1,46 @@
+(function () {
+    const button = document.getElementById('more-reviews');
+    if (!button) {
+        return;
+    }
+
+    function pad(number) {
+        return String(number).padStart(2, '0');
+    }
+
+    function review(item) {
+        const posted = new Date(item.posted);
+        const list = document.createElement('ul');
+        list.className = 'reviews';
+        list.innerHTML = '<li><div class="review-heading"><h5 class="name"></h5>' +
+            '<p class="date"></p><div class="review-rating"></div></div>' +
+            '<div class="review-body"><p></p></div></li>';
+        list.querySelector('.name').textContent = item.username;
+        list.querySelector('.date').textContent =
+            pad(posted.getDate()) + '/' + pad(posted.getMonth() + 1) + '/' +
+            posted.getFullYear() + ' ' + pad(posted.getHours()) + ':' +
+            pad(posted.getMinutes());
+        list.querySelector('.review-rating').innerHTML =
+            '<i class="fa fa-star"></i>'.repeat(item.rating);
+        list.querySelector('.review-body p').textContent = item.text;
+        return list;
+    }
+
+    button.addEventListener('click', function () {
+        button.disabled = true;
+        fetch(button.dataset.url + '?cursor=' + encodeURIComponent(button.dataset.cursor))
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                data.results.forEach(function (item) {
+                    button.parentNode.insertBefore(review(item), button);
+                });
+                if (data.next_cursor) {
+                    button.dataset.cursor = data.next_cursor;
+                    button.disabled = false;
+                } else {
+                    button.remove();
+                }
+            })
+            .catch(function () { button.disabled = false; });
+    });
+})();
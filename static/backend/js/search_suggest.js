@@ -0,0 +1,35 @@
+(function () {
+    const input = document.querySelector('input[data-suggest-url]');
+    if (!input) {
+        return;
+    }
+    const list = document.getElementById(input.getAttribute('list'));
+    let timer = null;
+    let lastPrefix = '';
+
+    function render(data) {
+        list.innerHTML = '';
+        ['products', 'brands', 'categories'].forEach(function (kind) {
+            (data[kind] || []).forEach(function (item) {
+                const option = document.createElement('option');
+                option.value = item.name;
+                list.appendChild(option);
+            });
+        });
+    }
+
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        const prefix = input.value.trim();
+        if (prefix.length < 2 || prefix === lastPrefix) {
+            return;
+        }
+        timer = setTimeout(function () {
+            lastPrefix = prefix;
+            fetch(input.dataset.suggestUrl + '?q=' + encodeURIComponent(prefix))
+                .then(function (response) { return response.ok ? response.json() : {}; })
+                .then(render)
+                .catch(function () {});
+        }, 150);
+    });
+})();